@@ -0,0 +1,391 @@
+"""
+Arquivo frio (colunar) do histórico de localizações
+
+Localizações mais antigas que ARCHIVE_AFTER_DAYS saem da tabela `locations`
+e vão para arquivos NumPy por pet e por mês, um arquivo por coluna:
+
+    <ARCHIVE_FOLDER>/<pet_id>/<AAAA-MM>/<coluna>.npy
+
+Os arquivos são abertos com mmap, então uma leitura por intervalo é só um
+fatiamento (zero-copy) das colunas, sem materializar linhas do ORM.
+"""
+
+import os
+import shutil
+from datetime import datetime, timedelta
+from itertools import chain
+
+import numpy as np
+from flask import current_app
+
+from sqlalchemy import BigInteger, Integer, func, select, type_coerce
+
+from models import db, Location
+from epoch import to_epoch_us, from_epoch_us
+
+# Colunas arquivadas e seus tipos. Valores nulos viram NaN (floats) ou -1 (inteiros).
+COLUMNS = (
+    ('id', '<i8'),
+    ('timestamp', '<i8'),  # microssegundos desde a época (UTC)
+    ('latitude', '<f8'),
+    ('longitude', '<f8'),
+    ('altitude', '<f8'),
+    ('speed', '<f8'),
+    ('satellites', '<i2'),
+    ('hdop', '<f8'),
+    ('dwell_count', '<i4'),
+    ('dwell_until', '<i8'),  # microssegundos desde a época, -1 = nulo
+)
+
+NULL_SATELLITES = -1
+NULL_TIMESTAMP = -1
+
+# Valor usado quando um mês foi arquivado antes da coluna existir
+COLUMN_DEFAULTS = {
+    'dwell_count': 1,
+    'dwell_until': NULL_TIMESTAMP,
+}
+
+
+# ============================================
+# FUNÇÕES AUXILIARES
+# ============================================
+
+def _archive_root():
+    return current_app.config['ARCHIVE_FOLDER']
+
+
+def _pet_dir(pet_id):
+    return os.path.join(_archive_root(), str(pet_id))
+
+
+def _month_start(dt):
+    return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(dt):
+    return (dt.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def _list_months(pet_id):
+    """Meses arquivados do pet, em ordem crescente (nomes AAAA-MM)"""
+    pet_dir = _pet_dir(pet_id)
+    if not os.path.isdir(pet_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(pet_dir)
+        if os.path.isfile(os.path.join(pet_dir, name, 'timestamp.npy'))
+    )
+
+
+def _load_month(pet_id, month):
+    """Abre as colunas de um mês com mmap (somente leitura)"""
+    month_dir = os.path.join(_pet_dir(pet_id), month)
+    columns = {}
+    for name, dtype in COLUMNS:
+        path = os.path.join(month_dir, f'{name}.npy')
+        if os.path.isfile(path):
+            columns[name] = np.load(path, mmap_mode='r')
+        else:
+            columns[name] = np.full(len(columns['timestamp']), COLUMN_DEFAULTS[name], dtype=dtype)
+    return columns
+
+
+def _write_month(pet_id, month, columns):
+    """Grava as colunas de um mês de forma atômica (diretório temporário + rename)"""
+    pet_dir = _pet_dir(pet_id)
+    final_dir = os.path.join(pet_dir, month)
+    tmp_dir = final_dir + '.tmp'
+    old_dir = final_dir + '.old'
+
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, dtype in COLUMNS:
+        np.save(os.path.join(tmp_dir, f'{name}.npy'), np.ascontiguousarray(columns[name], dtype=dtype))
+
+    if os.path.isdir(final_dir):
+        shutil.rmtree(old_dir, ignore_errors=True)
+        os.rename(final_dir, old_dir)
+    os.rename(tmp_dir, final_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def _range_bounds(timestamps, start_us, end_us):
+    """Índices [lo, hi) das posições com start <= timestamp <= end (coluna ordenada)"""
+    lo = 0 if start_us is None else int(np.searchsorted(timestamps, start_us, side='left'))
+    hi = len(timestamps) if end_us is None else int(np.searchsorted(timestamps, end_us, side='right'))
+    return lo, max(lo, hi)
+
+
+def _segments(pet_id, start=None, end=None, descending=True):
+    """Gera (colunas, lo, hi) para cada mês arquivado que intersecta o intervalo"""
+    start_us = to_epoch_us(start) if start is not None else None
+    end_us = to_epoch_us(end) if end is not None else None
+
+    months = _list_months(pet_id)
+    if descending:
+        months = reversed(months)
+
+    for month in months:
+        columns = _load_month(pet_id, month)
+        lo, hi = _range_bounds(columns['timestamp'], start_us, end_us)
+        if hi > lo:
+            yield columns, lo, hi
+
+
+def _rows_to_dicts(pet_id, columns, lo, hi, descending):
+    """Converte um trecho das colunas no mesmo formato de Location.to_dict"""
+    def _col(name):
+        values = columns[name][lo:hi]
+        return (values[::-1] if descending else values).tolist()
+
+    ids = _col('id')
+    timestamps = _col('timestamp')
+    lats = _col('latitude')
+    lngs = _col('longitude')
+    altitudes = _col('altitude')
+    speeds = _col('speed')
+    satellites = _col('satellites')
+    hdops = _col('hdop')
+    dwell_counts = _col('dwell_count')
+    dwell_untils = _col('dwell_until')
+
+    def _float(value):
+        return None if value != value else value  # NaN -> None
+
+    return [
+        {
+            'id': ids[i],
+            'pet_id': pet_id,
+            'latitude': lats[i],
+            'longitude': lngs[i],
+            'altitude': _float(altitudes[i]),
+            'speed': _float(speeds[i]),
+            'satellites': None if satellites[i] == NULL_SATELLITES else satellites[i],
+            'hdop': _float(hdops[i]),
+            'timestamp': from_epoch_us(timestamps[i]),
+            'dwell_count': dwell_counts[i],
+            'dwell_until': None if dwell_untils[i] == NULL_TIMESTAMP else from_epoch_us(dwell_untils[i])
+        }
+        for i in range(len(ids))
+    ]
+
+
+# ============================================
+# LEITURA
+# ============================================
+
+def count_archived(pet_id, start=None, end=None):
+    """Quantidade de localizações arquivadas do pet no intervalo"""
+    return sum(hi - lo for _, lo, hi in _segments(pet_id, start, end))
+
+
+def _read_page(pet_id, offset, limit, start, end, convert):
+    """
+    Aplica `convert(columns, lo, hi)` aos trechos de uma página do histórico
+    arquivado, da mais recente para a mais antiga
+    """
+    chunks = []
+    remaining = limit
+    for columns, lo, hi in _segments(pet_id, start, end, descending=True):
+        size = hi - lo
+        if offset >= size:
+            offset -= size
+            continue
+
+        # Em ordem decrescente, pular `offset` itens significa recuar o fim do trecho
+        seg_hi = hi - offset
+        seg_lo = max(lo, seg_hi - remaining)
+        chunks.append(convert(columns, seg_lo, seg_hi))
+        remaining -= seg_hi - seg_lo
+        offset = 0
+
+        if remaining <= 0:
+            break
+
+    return chunks
+
+
+def read_archived(pet_id, offset, limit, start=None, end=None):
+    """
+    Página do histórico arquivado, da mais recente para a mais antiga,
+    no mesmo formato de Location.to_dict
+    """
+    items = []
+    for chunk in _read_page(pet_id, offset, limit, start, end,
+                            lambda columns, lo, hi: _rows_to_dicts(pet_id, columns, lo, hi, descending=True)):
+        items.extend(chunk)
+    return items
+
+
+def read_archived_columns(pet_id, offset, limit, names, start=None, end=None):
+    """
+    Como read_archived, mas em colunas (listas) só com `names`. Nulos viram
+    None e timestamp/dwell_until ficam em microssegundos desde a época.
+    """
+    def _convert(columns, lo, hi):
+        chunk = {}
+        for name in names:
+            column = columns[name][lo:hi][::-1]
+            values = column.tolist()
+            if column.dtype.kind == 'f' and np.isnan(column).any():
+                values = [None if v != v else v for v in values]  # NaN -> None
+            elif name == 'satellites':
+                values = [None if v == NULL_SATELLITES else v for v in values]
+            elif name == 'dwell_until':
+                values = [None if v == NULL_TIMESTAMP else v for v in values]
+            chunk[name] = values
+        return chunk
+
+    result = {name: [] for name in names}
+    for chunk in _read_page(pet_id, offset, limit, start, end, _convert):
+        for name in names:
+            result[name].extend(chunk[name])
+    return result
+
+
+def iter_archived_columns(pet_id, start=None, end=None):
+    """
+    Gera dicionários de colunas (views mmap, sem cópia) por mês arquivado,
+    em ordem cronológica, já recortados ao intervalo pedido
+    """
+    for columns, lo, hi in _segments(pet_id, start, end, descending=False):
+        yield {name: values[lo:hi] for name, values in columns.items()}
+
+
+def iter_track_columns(pet_id, start=None, end=None, chunk_size=50000):
+    """
+    Trajeto completo do pet (arquivo + tabela) em lotes de colunas NumPy, em
+    ordem cronológica: timestamp e dwell_until (microssegundos, -1 = nulo),
+    latitude e longitude. A tabela é lida em lotes com os inteiros do formato
+    compacto, sem converter linha a linha.
+    """
+    for columns in iter_archived_columns(pet_id, start, end):
+        yield {name: columns[name] for name in ('timestamp', 'dwell_until', 'latitude', 'longitude')}
+
+    query = select(
+        type_coerce(Location.timestamp, BigInteger),
+        func.coalesce(type_coerce(Location.dwell_until, BigInteger), NULL_TIMESTAMP),
+        type_coerce(Location.latitude, Integer),
+        type_coerce(Location.longitude, Integer),
+    ).where(Location.pet_id == pet_id)
+    if start is not None:
+        query = query.where(Location.timestamp >= start)
+    if end is not None:
+        query = query.where(Location.timestamp <= end)
+    query = query.order_by(Location.timestamp.asc(), Location.id.asc())
+
+    # Core direto na conexão da sessão (réplica, se for o caso): sem a camada do ORM
+    connection = db.session.connection(bind_arguments={'clause': query})
+    for rows in connection.execution_options(yield_per=chunk_size).execute(query).partitions():
+        values = np.fromiter(chain.from_iterable(rows), dtype='<i8', count=4 * len(rows)).reshape(-1, 4)
+        yield {
+            'timestamp': values[:, 0],
+            'dwell_until': values[:, 1],
+            'latitude': values[:, 2] / Location.latitude.type.scale,
+            'longitude': values[:, 3] / Location.longitude.type.scale,
+        }
+
+
+# ============================================
+# ESCRITA (ARQUIVAMENTO)
+# ============================================
+
+def _merge_columns(existing, fresh):
+    """Junta colunas já arquivadas com novas, ordenando por timestamp e removendo ids repetidos"""
+    merged = {name: np.concatenate([np.asarray(existing[name]), fresh[name]]) for name, _ in COLUMNS}
+    _, unique_idx = np.unique(merged['id'], return_index=True)
+    order = unique_idx[np.argsort(merged['timestamp'][unique_idx], kind='stable')]
+    return {name: values[order] for name, values in merged.items()}
+
+
+def _fetch_month_columns(pet_id, month_start, month_end, keep_id):
+    """Lê as localizações do mês direto em colunas (sem instanciar objetos do ORM)"""
+    query = db.session.query(
+        Location.id, Location.timestamp, Location.latitude, Location.longitude,
+        Location.altitude, Location.speed, Location.satellites, Location.hdop,
+        Location.dwell_count, Location.dwell_until
+    ).filter(
+        Location.pet_id == pet_id,
+        Location.timestamp >= month_start,
+        Location.timestamp < month_end,
+        Location.id != keep_id
+    ).order_by(Location.timestamp.asc(), Location.id.asc())
+
+    rows = query.all()
+    if not rows:
+        return None
+
+    ids, timestamps, lats, lngs, alts, speeds, sats, hdops, dwell_counts, dwell_untils = zip(*rows)
+
+    def _nullable(values):
+        return [np.nan if v is None else v for v in values]
+
+    return {
+        'id': np.array(ids, dtype='<i8'),
+        'timestamp': np.array([to_epoch_us(t) for t in timestamps], dtype='<i8'),
+        'latitude': np.array(lats, dtype='<f8'),
+        'longitude': np.array(lngs, dtype='<f8'),
+        'altitude': np.array(_nullable(alts), dtype='<f8'),
+        'speed': np.array(_nullable(speeds), dtype='<f8'),
+        'satellites': np.array([NULL_SATELLITES if v is None else v for v in sats], dtype='<i2'),
+        'hdop': np.array(_nullable(hdops), dtype='<f8'),
+        'dwell_count': np.array([v or 1 for v in dwell_counts], dtype='<i4'),
+        'dwell_until': np.array(
+            [NULL_TIMESTAMP if v is None else to_epoch_us(v) for v in dwell_untils], dtype='<i8'
+        ),
+    }
+
+
+def archive_cold_locations(now=None):
+    """
+    Move para o arquivo colunar os meses completos anteriores ao corte
+    (ARCHIVE_AFTER_DAYS). A última localização de cada pet nunca é arquivada,
+    para que a consulta de "última localização" continue só na tabela.
+
+    Retorna o número de localizações arquivadas.
+    """
+    now = now or datetime.utcnow()
+    cutoff = _month_start(now - timedelta(days=current_app.config['ARCHIVE_AFTER_DAYS']))
+
+    candidates = db.session.query(
+        Location.pet_id,
+        db.func.min(Location.timestamp),
+    ).filter(Location.timestamp < cutoff).group_by(Location.pet_id).all()
+
+    archived = 0
+    for pet_id, oldest in candidates:
+        keep_id = db.session.query(Location.id).filter_by(pet_id=pet_id).order_by(
+            Location.timestamp.desc(), Location.id.desc()
+        ).limit(1).scalar()
+
+        month_start = _month_start(oldest)
+        while month_start < cutoff:
+            month_end = _next_month(month_start)
+            fresh = _fetch_month_columns(pet_id, month_start, month_end, keep_id)
+
+            if fresh is not None:
+                month = month_start.strftime('%Y-%m')
+                if month in _list_months(pet_id):
+                    fresh = _merge_columns(_load_month(pet_id, month), fresh)
+                os.makedirs(_pet_dir(pet_id), exist_ok=True)
+                _write_month(pet_id, month, fresh)
+
+                # Só apaga da tabela depois que o arquivo foi gravado
+                deleted = Location.query.filter(
+                    Location.pet_id == pet_id,
+                    Location.timestamp >= month_start,
+                    Location.timestamp < month_end,
+                    Location.id != keep_id
+                ).delete(synchronize_session=False)
+                db.session.commit()
+                archived += deleted
+
+            month_start = month_end
+
+    return archived
+
+
+def delete_pet_archive(pet_id):
+    """Remove todo o histórico arquivado de um pet"""
+    shutil.rmtree(_pet_dir(pet_id), ignore_errors=True)
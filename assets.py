@@ -0,0 +1,141 @@
+"""
+Arquivos estáticos com hash no nome, pré-comprimidos e com cache longo
+
+`flask build-assets` copia os arquivos de static/ (menos uploads/) para
+static/dist/ com o hash do conteúdo no nome (api.3f2a9c01b4.js), gera as
+versões .gz e .br ao lado e grava o manifest.json. Nos templates,
+`asset_url('api.js')` aponta para a versão com hash, servida em /assets/
+com `Cache-Control: immutable`: o navegador não pede o arquivo de novo até
+o conteúdo mudar (e aí o nome muda junto).
+
+Sem build (desenvolvimento), `asset_url` cai para o /static/ normal.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+
+from flask import current_app, request, send_from_directory, url_for
+
+from compression import COMPRESSIBLE_MIMETYPES
+
+try:
+    import brotli
+except ImportError:  # opcional
+    brotli = None
+
+DIST_FOLDER = 'dist'
+MANIFEST_NAME = 'manifest.json'
+SKIP_FOLDERS = {DIST_FOLDER, 'uploads'}
+HASH_LENGTH = 10
+
+# Extensão do arquivo pré-comprimido, na ordem de preferência
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _source_files(static_folder):
+    for root, dirs, files in os.walk(static_folder):
+        if root == static_folder:
+            dirs[:] = [d for d in dirs if d not in SKIP_FOLDERS]
+        for name in files:
+            path = os.path.join(root, name)
+            yield os.path.relpath(path, static_folder).replace(os.sep, '/'), path
+
+
+def _write(path, data):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def build_assets(static_folder):
+    """
+    Gera static/dist/ e o manifest. Builds anteriores não são apagados, para
+    que workers ainda com o manifest antigo continuem funcionando durante o deploy.
+    Retorna o manifest (nome original -> nome com hash).
+    """
+    dist_folder = os.path.join(static_folder, DIST_FOLDER)
+    manifest = {}
+
+    for name, path in sorted(_source_files(static_folder)):
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+        base, ext = os.path.splitext(name)
+        hashed_name = f'{base}.{digest}{ext}'
+        manifest[name] = hashed_name
+
+        target = os.path.join(dist_folder, hashed_name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.exists(target):
+            continue
+
+        _write(target, data)
+        if mimetypes.guess_type(name)[0] in COMPRESSIBLE_MIMETYPES:
+            _write(f'{target}.gz', gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                _write(f'{target}.br', brotli.compress(data, quality=11))
+
+    _write(os.path.join(dist_folder, MANIFEST_NAME), json.dumps(manifest, indent=2).encode())
+    return manifest
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST_FOLDER, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def asset_url(filename):
+    """URL do arquivo estático: versão com hash se houver build, senão /static/"""
+    hashed_name = current_app.extensions['assets'].get(filename)
+    if hashed_name is None:
+        return url_for('static', filename=filename)
+    return url_for('serve_asset', filename=hashed_name)
+
+
+def init_app(app):
+    app.extensions['assets'] = load_manifest(app.static_folder)
+    app.add_template_global(asset_url)
+    dist_folder = os.path.join(app.static_folder, DIST_FOLDER)
+
+    @app.route('/assets/<path:filename>')
+    def serve_asset(filename):
+        """Arquivo com hash: usa a versão pré-comprimida aceita pelo cliente"""
+        encodings = request.accept_encodings
+        options = {
+            'mimetype': mimetypes.guess_type(filename)[0],
+            'max_age': app.config['ASSETS_MAX_AGE'],
+        }
+
+        for encoding, suffix in PRECOMPRESSED:
+            if encodings[encoding] > 0 and os.path.isfile(os.path.join(dist_folder, filename + suffix)):
+                response = send_from_directory(dist_folder, filename + suffix, **options)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(dist_folder, filename, **options)
+
+        response.vary.add('Accept-Encoding')
+        response.cache_control.immutable = True
+        return response
+
+    @app.after_request
+    def cache_uploads(response):
+        # Uploads nunca são sobrescritos (nome único por arquivo): podem ficar em cache
+        if (
+            request.endpoint == 'static'
+            and response.status_code == 200
+            and request.view_args.get('filename', '').startswith('uploads/')
+        ):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = app.config['ASSETS_MAX_AGE']
+            response.cache_control.immutable = True
+        return response
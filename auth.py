@@ -0,0 +1,184 @@
+"""
+Autenticação: cache de usuários e tokens assinados para clientes de API
+
+- O user_loader do Flask-Login consulta um cache em memória com TTL curto,
+  evitando um SELECT em users a cada requisição autenticada.
+- Clientes móveis/API podem usar `Authorization: Bearer <token>`. O token é
+  assinado com a SECRET_KEY e carrega o id do usuário e um carimbo da senha
+  atual: trocar a senha revoga os tokens antigos. A conferência usa o mesmo
+  cache de usuários (no máximo uma leitura no banco por TTL).
+- Tentativas de login são limitadas por conta e por IP, para que o hash de
+  senha não possa ser usado para esgotar a CPU.
+"""
+
+import hashlib
+import threading
+import time
+from collections import deque
+
+from flask import current_app
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+
+from models import db, User
+
+TOKEN_SALT = 'patatag-api-token'
+LOGIN_ATTEMPTS_SWEEP_SIZE = 10000
+
+_user_cache = {}
+_user_cache_lock = threading.Lock()
+
+_login_attempts = {}
+_login_attempts_lock = threading.Lock()
+
+
+# ============================================
+# CACHE DE USUÁRIOS
+# ============================================
+
+def _attach(user):
+    """Anexa uma cópia do usuário à sessão atual sem consultar o banco"""
+    return db.session.merge(user, load=False)
+
+
+def load_cached_user(user_id):
+    """Carrega o usuário pelo id, usando o cache enquanto o TTL não expirar"""
+    now = time.monotonic()
+    entry = _user_cache.get(user_id)
+
+    if entry and entry[0] > now:
+        return _attach(entry[1])
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+
+    # Guarda uma instância desanexada; cada requisição recebe a sua própria cópia
+    db.session.expunge(user)
+    with _user_cache_lock:
+        _user_cache[user_id] = (now + current_app.config['USER_CACHE_TTL'], user)
+
+    return _attach(user)
+
+
+def invalidate_user(user_id):
+    """Remove o usuário do cache (chamar após alterar os dados dele)"""
+    with _user_cache_lock:
+        _user_cache.pop(user_id, None)
+
+
+# ============================================
+# TOKENS ASSINADOS (BEARER)
+# ============================================
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=TOKEN_SALT)
+
+
+def _password_stamp(user):
+    """Resumo curto do hash da senha: muda quando a senha muda"""
+    return hashlib.sha256(user.password_hash.encode()).hexdigest()[:16]
+
+
+def generate_api_token(user):
+    """Gera um token assinado para o usuário"""
+    return _serializer().dumps({'uid': user.id, 'pw': _password_stamp(user)})
+
+
+def load_user_from_token(token):
+    """
+    Valida o token e devolve o usuário, ou None se for inválido, expirado ou
+    de antes da última troca de senha
+    """
+    try:
+        claims = _serializer().loads(token, max_age=current_app.config['API_TOKEN_MAX_AGE'])
+    except (SignatureExpired, BadSignature):
+        return None
+
+    user_id = claims.get('uid') if isinstance(claims, dict) else None
+    if not isinstance(user_id, int):
+        return None
+
+    # Outros workers só enxergam a troca de senha quando o cache expira (USER_CACHE_TTL)
+    user = load_cached_user(user_id)
+    if user is None or claims.get('pw') != _password_stamp(user):
+        return None
+    return user
+
+
+# ============================================
+# LIMITE DE TENTATIVAS DE LOGIN
+# ============================================
+
+def _recent_attempts(key, now, window):
+    """Tentativas da chave dentro da janela (descarta as antigas)"""
+    attempts = _login_attempts.get(key)
+    if attempts is None:
+        return None
+    while attempts and attempts[0] <= now - window:
+        attempts.popleft()
+    if not attempts:
+        del _login_attempts[key]
+        return None
+    return attempts
+
+
+def _retry_after(limits):
+    """Segundos até liberar a mais restrita das (chave, limite), ou 0"""
+    window = current_app.config['LOGIN_THROTTLE_WINDOW']
+    now = time.monotonic()
+    retry_after = 0
+    with _login_attempts_lock:
+        for key, limit in limits:
+            attempts = _recent_attempts(key, now, window)
+            if attempts and len(attempts) >= limit:
+                retry_after = max(retry_after, attempts[0] + window - now)
+
+    return int(retry_after) + 1 if retry_after else 0
+
+
+def _record(keys):
+    now = time.monotonic()
+    window = current_app.config['LOGIN_THROTTLE_WINDOW']
+    with _login_attempts_lock:
+        # Varredura ocasional para não acumular IPs que nunca voltam
+        if len(_login_attempts) > LOGIN_ATTEMPTS_SWEEP_SIZE:
+            for key in list(_login_attempts):
+                _recent_attempts(key, now, window)
+
+        for key in keys:
+            _login_attempts.setdefault(key, deque()).append(now)
+
+
+def login_retry_after(email, ip):
+    """
+    Segundos até a próxima tentativa de login ser aceita para esta conta/IP,
+    ou 0 se a tentativa pode prosseguir
+    """
+    config = current_app.config
+    limits = [(('ip', ip), config['LOGIN_MAX_FAILURES_PER_IP'])]
+    if email:
+        limits.append((('account', email.lower()), config['LOGIN_MAX_FAILURES_PER_ACCOUNT']))
+    return _retry_after(limits)
+
+
+def record_login_attempt(email, ip, success):
+    """
+    Registra uma tentativa de login. Só as falhas contam, para o IP e para a
+    conta: muitos usuários atrás do mesmo IP (escritório, proxy) entram
+    normalmente. Um login correto zera o contador da conta.
+    """
+    if success:
+        with _login_attempts_lock:
+            _login_attempts.pop(('account', email.lower()), None)
+        return
+    _record([('ip', ip), ('account', email.lower())])
+
+
+def register_retry_after(ip):
+    """Segundos até o próximo cadastro deste IP ser aceito, ou 0"""
+    return _retry_after([(('register', ip), current_app.config['REGISTER_MAX_PER_IP'])])
+
+
+def record_registration(ip):
+    """Cadastro também gasta hash de senha: conta num limite próprio por IP"""
+    _record([('register', ip)])
@@ -0,0 +1,133 @@
+"""
+Benchmark: serialização e bytes na rede de uma resposta de histórico com 10k localizações
+
+Compara o JSON padrão do Flask (datas convertidas com isoformat(), como antes)
+com o FastJSONProvider (orjson quando instalado) e mostra o tamanho da
+resposta sem compressão, com gzip e com brotli. Por fim compara os formatos
+da resposta (?format=objects, polyline e columns).
+
+Uso:
+    python benchmarks/history_payload.py [linhas]
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import compact
+import compression
+from config import Config
+from epoch import to_epoch_us
+from json_provider import FastJSONProvider, orjson
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+REPEAT = 5
+
+
+def build_history(rows):
+    """Histórico sintético no formato de Location.to_dict"""
+    start = datetime(2025, 1, 1)
+    return {
+        'locations': [
+            {
+                'id': i,
+                'pet_id': 1,
+                'latitude': -23.550520 + i * 1e-5,
+                'longitude': -46.633308 - i * 1e-5,
+                'altitude': None if i % 3 else 760.5,
+                'speed': 1.25,
+                'satellites': None if i % 2 else 8,
+                'hdop': 1.1,
+                'timestamp': start + timedelta(seconds=30 * i, microseconds=i)
+            }
+            for i in range(rows)
+        ],
+        'total': rows,
+        'pages': 1,
+        'current_page': 1
+    }
+
+
+def with_isoformat(payload):
+    """Como o to_dict() fazia antes: datas convertidas em string"""
+    return {
+        **payload,
+        'locations': [{**loc, 'timestamp': loc['timestamp'].isoformat()} for loc in payload['locations']]
+    }
+
+
+def to_columns(payload):
+    """Colunas como o get_pet_history monta (datas em microssegundos)"""
+    locations = payload['locations']
+    columns = {}
+    for name in compact.COLUMNS:
+        values = [loc.get(name) for loc in locations]
+        if name in ('timestamp', 'dwell_until'):
+            values = [None if value is None else to_epoch_us(value) for value in values]
+        columns[name] = values
+    return columns
+
+
+def best_of(func):
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    payload = build_history(ROWS)
+
+    default_provider = DefaultJSONProvider(app)
+    fast_provider = FastJSONProvider(app)
+
+    with app.app_context():
+        default_time, default_body = best_of(
+            lambda: default_provider.response(with_isoformat(payload)).get_data()
+        )
+        fast_time, fast_body = best_of(lambda: fast_provider.response(payload).get_data())
+
+    print(f'Histórico com {ROWS} localizações')
+    print(f'orjson: {"sim" if orjson else "não instalado"} | brotli: {"sim" if compression.brotli else "não instalado"}')
+    print()
+    print(f'{"serialização":<28}{"tempo (ms)":>12}{"bytes":>12}')
+    print(f'{"json padrão + isoformat()":<28}{default_time * 1000:>12.1f}{len(default_body):>12}')
+    print(f'{"FastJSONProvider":<28}{fast_time * 1000:>12.1f}{len(fast_body):>12}')
+    print(f'{"ganho":<28}{default_time / fast_time:>11.1f}x')
+    print()
+
+    print(f'{"na rede":<28}{"tempo (ms)":>12}{"bytes":>12}{"razão":>10}')
+    print(f'{"identity":<28}{0:>12.1f}{len(fast_body):>12}{1:>10.1f}')
+    for encoding in ('gzip', 'br'):
+        if encoding == 'br' and compression.brotli is None:
+            continue
+        elapsed, body = best_of(lambda: compression.compress(fast_body, encoding, app.config))
+        print(f'{encoding:<28}{elapsed * 1000:>12.1f}{len(body):>12}{len(fast_body) / len(body):>10.1f}')
+    print()
+
+    columns = to_columns(payload)
+    formats = {
+        'objects': lambda: payload,
+        'polyline': lambda: compact.polyline_payload(columns),
+        'columns': lambda: compact.columns_payload(columns),
+    }
+    print(f'{"?format=":<28}{"tempo (ms)":>12}{"bytes":>12}{"gzip":>10}{"razão":>10}')
+    with app.app_context():
+        for name, build in formats.items():
+            elapsed, body = best_of(lambda: fast_provider.response(build()).get_data())
+            gzipped = compression.compress(body, 'gzip', app.config)
+            print(f'{name:<28}{elapsed * 1000:>12.1f}{len(body):>12}{len(gzipped):>10}{len(fast_body) / len(body):>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark: tempo de inicialização de um worker
+
+Cada medição roda num processo Python novo (como um worker recém-criado do
+gunicorn), para que nenhum módulo já esteja em cache. Mede:
+
+- import app: só o módulo (sem criar a aplicação)
+- create_app(with_routes=False): o que init_db.py e scripts usam
+- create_app(): aplicação completa, como no wsgi.py
+- primeira requisição: create_app() + GET /api/pets (carrega o que é preguiçoso)
+
+Uso:
+    python benchmarks/import_time.py [repetições]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPEAT = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+TIMER = '''
+import time
+_start = time.perf_counter()
+{code}
+print((time.perf_counter() - _start) * 1000)
+'''
+
+SCENARIOS = [
+    ('import app', 'import app'),
+    ('create_app(with_routes=False)', 'from app import create_app; create_app(with_routes=False)'),
+    ('create_app()', 'from app import create_app; create_app()'),
+    ('primeira requisição', 'from app import create_app; create_app().test_client().get("/api/pets")'),
+]
+
+
+def measure(code):
+    env = dict(os.environ, PASSWORD_HASH_WORKERS='0')
+    output = subprocess.run(
+        [sys.executable, '-c', TIMER.format(code=code)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def heavy_modules():
+    """Módulos pesados já carregados depois de create_app()"""
+    code = (
+        'import sys; from app import create_app; create_app(); '
+        'print(",".join(m for m in ("numpy", "archive", "schema") if m in sys.modules))'
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return output.strip() or 'nenhum'
+
+
+def main():
+    print(f'{REPEAT} processos novos por cenário (mediana / mínimo)\n')
+    for name, code in SCENARIOS:
+        samples = [measure(code) for _ in range(REPEAT)]
+        print(f'{name:32s} {statistics.median(samples):8.1f} ms {min(samples):8.1f} ms')
+
+    print(f'\nCarregados por create_app(): {heavy_modules()}')
+    print('Detalhes por módulo: python -X importtime -c "from app import create_app; create_app()"')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,21 @@
+"""
+Blueprints da aplicação (uma área da API por módulo)
+"""
+
+from blueprints import alerts, auth, dashboard, geofence, gps, pages, pets, stream
+
+BLUEPRINTS = (
+    pages.bp,
+    auth.bp,
+    pets.bp,
+    gps.bp,
+    geofence.bp,
+    alerts.bp,
+    stream.bp,
+    dashboard.bp,
+)
+
+
+def register_blueprints(app):
+    for bp in BLUEPRINTS:
+        app.register_blueprint(bp)
@@ -0,0 +1,53 @@
+"""
+Alertas do usuário
+"""
+
+from flask import Blueprint, jsonify
+from flask_login import login_required, current_user
+
+from models import db, Pet, Alert
+from routing import use_read_replica
+from caching import etagged
+
+bp = Blueprint('alerts', __name__)
+
+
+# ============================================
+# API - ALERTAS
+# ============================================
+
+@bp.route('/api/alerts', methods=['GET'])
+@login_required
+@use_read_replica
+@etagged
+def get_alerts():
+    """Listar alertas do usuário"""
+    alerts = Alert.query.join(Pet).filter(
+        Pet.user_id == current_user.id,
+        Pet.deleted_at.is_(None)
+    ).order_by(
+        Alert.created_at.desc()
+    ).limit(50).all()
+
+    return jsonify({
+        'alerts': [alert.to_dict() for alert in alerts]
+    }), 200
+
+
+@bp.route('/api/alerts/<int:alert_id>/read', methods=['POST'])
+@login_required
+def mark_alert_read(alert_id):
+    """Marcar alerta como lido"""
+    alert = Alert.query.join(Pet).filter(
+        Alert.id == alert_id,
+        Pet.user_id == current_user.id,
+        Pet.deleted_at.is_(None)
+    ).first()
+
+    if not alert:
+        return jsonify({'error': 'Alerta não encontrado'}), 404
+
+    alert.is_read = True
+    db.session.commit()
+
+    return jsonify({'message': 'Alerta marcado como lido'}), 200
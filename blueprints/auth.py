@@ -0,0 +1,222 @@
+"""
+Autenticação, cadastro e perfil do usuário
+"""
+
+import hashlib
+import os
+
+from flask import Blueprint, current_app, render_template, request, jsonify, url_for
+from flask_login import LoginManager, login_user, logout_user, login_required, current_user
+
+from models import db, User
+import auth
+import hashing
+
+bp = Blueprint('auth', __name__)
+
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'
+
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+def too_many_attempts(retry_after):
+    """Resposta 429 para tentativas de login acima do limite"""
+    response = jsonify({'error': 'Muitas tentativas. Tente novamente mais tarde.'})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+@bp.app_errorhandler(hashing.HashingBusy)
+def hashing_busy(error):
+    response = jsonify({'error': 'Servidor ocupado. Tente novamente em instantes.'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    return auth.load_cached_user(int(user_id))
+
+
+@login_manager.request_loader
+def load_user_from_request(req):
+    """Autenticação por token (Authorization: Bearer <token>) para clientes de API"""
+    header = req.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return auth.load_user_from_token(header[len('Bearer '):].strip())
+    return None
+
+
+# ============================================
+# ROTAS DE API - UPLOAD E PERFIL (NOVO)
+# ============================================
+
+@bp.route('/api/upload', methods=['POST'])
+@login_required
+def upload_file():
+    """Fazer upload de imagem"""
+    if 'file' not in request.files:
+        return jsonify({'error': 'Nenhum arquivo enviado'}), 400
+    
+    file = request.files['file']
+    
+    if file.filename == '':
+        return jsonify({'error': 'Nenhum arquivo selecionado'}), 400
+        
+    if file and allowed_file(file.filename):
+        # Nome pelo hash do conteúdo: o arquivo nunca muda, então pode ficar em cache
+        data = file.read()
+        extension = file.filename.rsplit('.', 1)[1].lower()  # já validada por allowed_file
+        filename = f"{hashlib.sha256(data).hexdigest()[:16]}.{extension}"
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        os.makedirs(upload_folder, exist_ok=True)
+        path = os.path.join(upload_folder, filename)
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(data)
+        
+        # Retornar URL pública do arquivo
+        file_url = url_for('static', filename=f'uploads/{filename}')
+        return jsonify({'url': file_url}), 200
+    
+    return jsonify({'error': 'Tipo de arquivo não permitido'}), 400
+
+@bp.route('/api/user', methods=['PUT'])
+@login_required
+def update_user():
+    """Atualizar perfil do usuário"""
+    data = request.json
+    
+    if 'name' in data:
+        current_user.name = data['name']
+    
+    if 'profile_image' in data:
+        current_user.profile_image = data['profile_image']
+        
+    if 'password' in data and data['password']:
+        current_user.set_password(data['password'])
+        
+    db.session.commit()
+    auth.invalidate_user(current_user.id)
+    return jsonify({'message': 'Perfil atualizado', 'user': current_user.to_dict()})
+
+
+# ============================================
+# ROTAS DE AUTENTICAÇÃO
+# ============================================
+
+@bp.route('/login')
+def login():
+    return render_template('login_web.html')
+
+
+@bp.route('/cadastro')
+def cadastro():
+    return render_template('cadastro_web.html')
+
+
+@bp.route('/api/register', methods=['POST'])
+def api_register():
+    """Registrar novo usuário"""
+    data = request.json
+
+    if not data.get('name') or not data.get('email') or not data.get('password'):
+        return jsonify({'error': 'Nome, email e senha são obrigatórios'}), 400
+
+    # Cadastro também gasta hash de senha: limite próprio por IP
+    retry_after = auth.register_retry_after(request.remote_addr)
+    if retry_after:
+        return too_many_attempts(retry_after)
+
+    # Verificar se o email já existe
+    if User.query.filter_by(email=data['email']).first():
+        return jsonify({'error': 'Email já cadastrado'}), 400
+
+    user = User(
+        name=data['name'],
+        email=data['email']
+    )
+    auth.record_registration(request.remote_addr)
+    user.set_password(data['password'])
+
+    db.session.add(user)
+    db.session.commit()
+
+    login_user(user, remember=True)
+
+    return jsonify({
+        'message': 'Usuário cadastrado com sucesso',
+        'user': user.to_dict()
+    }), 201
+
+
+@bp.route('/api/login', methods=['POST'])
+def api_login():
+    """Fazer login"""
+    data = request.json
+
+    if not data.get('email') or not data.get('password'):
+        return jsonify({'error': 'Email e senha são obrigatórios'}), 400
+    if not isinstance(data['email'], str) or not isinstance(data['password'], str):
+        return jsonify({'error': 'Email e senha devem ser texto'}), 400
+
+    retry_after = auth.login_retry_after(data['email'], request.remote_addr)
+    if retry_after:
+        return too_many_attempts(retry_after)
+
+    user = User.query.filter_by(email=data['email']).first()
+    valid = user is not None and user.check_password(data['password'])
+    auth.record_login_attempt(data['email'], request.remote_addr, success=valid)
+
+    if not valid:
+        return jsonify({'error': 'Email ou senha incorretos'}), 401
+
+    login_user(user, remember=True)
+
+    return jsonify({
+        'message': 'Login realizado com sucesso',
+        'user': user.to_dict()
+    }), 200
+
+
+@bp.route('/api/token', methods=['POST'])
+def api_token():
+    """Gerar token de acesso (Bearer) para apps e clientes de API"""
+    data = request.json
+
+    if not data.get('email') or not data.get('password'):
+        return jsonify({'error': 'Email e senha são obrigatórios'}), 400
+    if not isinstance(data['email'], str) or not isinstance(data['password'], str):
+        return jsonify({'error': 'Email e senha devem ser texto'}), 400
+
+    retry_after = auth.login_retry_after(data['email'], request.remote_addr)
+    if retry_after:
+        return too_many_attempts(retry_after)
+
+    user = User.query.filter_by(email=data['email']).first()
+    valid = user is not None and user.check_password(data['password'])
+    auth.record_login_attempt(data['email'], request.remote_addr, success=valid)
+
+    if not valid:
+        return jsonify({'error': 'Email ou senha incorretos'}), 401
+
+    return jsonify({
+        'token': auth.generate_api_token(user),
+        'token_type': 'Bearer',
+        'expires_in': current_app.config['API_TOKEN_MAX_AGE']
+    }), 200
+
+
+@bp.route('/api/logout', methods=['POST'])
+@login_required
+def api_logout():
+    """Fazer logout"""
+    logout_user()
+    return jsonify({'message': 'Logout realizado com sucesso'}), 200
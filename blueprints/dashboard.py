@@ -0,0 +1,65 @@
+"""
+Carga inicial do painel e do mapa numa requisição só
+"""
+
+from flask import Blueprint, jsonify
+from flask_login import login_required, current_user
+from sqlalchemy import func
+from sqlalchemy.orm import selectinload
+
+from models import db, Pet, Alert
+from routing import use_read_replica
+from caching import etagged
+
+bp = Blueprint('dashboard', __name__)
+
+RECENT_ALERTS = 50  # como em GET /api/alerts
+
+
+# ============================================
+# API - BOOTSTRAP
+# ============================================
+
+@bp.route('/api/bootstrap', methods=['GET'])
+@login_required
+@use_read_replica
+@etagged
+def get_bootstrap():
+    """
+    Tudo o que o painel e o mapa precisam ao abrir: usuário, pets (com última
+    localização, cercas e alertas não lidos) e alertas recentes
+
+    Número fixo de consultas, qualquer que seja o número de pets: pets, cercas
+    (selectinload), últimas localizações, contagem de não lidos por pet e
+    alertas recentes.
+    """
+    pets = Pet.active().filter_by(user_id=current_user.id).options(selectinload(Pet.zones)).all()
+    pet_ids = [pet.id for pet in pets]
+
+    last_locations = Pet.last_location_dicts(pets)
+    unread = {}
+    alerts = []
+    if pet_ids:
+        unread = dict(db.session.query(Alert.pet_id, func.count(Alert.id)).filter(
+            Alert.pet_id.in_(pet_ids),
+            Alert.is_read.is_(False)
+        ).group_by(Alert.pet_id).all())
+        alerts = Alert.query.filter(Alert.pet_id.in_(pet_ids)).order_by(
+            Alert.created_at.desc()
+        ).limit(RECENT_ALERTS).all()
+
+    items = []
+    for pet in pets:
+        item = pet.to_dict(include_last_location=True, last_locations=last_locations)
+        item['zones'] = [zone.to_dict() for zone in pet.zones]
+        item['unread_alerts'] = unread.get(pet.id, 0)
+        items.append(item)
+
+    versions = [pet.updated_at for pet in pets if pet.updated_at]
+    return jsonify({
+        'user': current_user.to_dict(),
+        'pets': items,
+        'alerts': [alert.to_dict() for alert in alerts],
+        'unread_alerts': sum(unread.values()),
+        'version': max(versions) if versions else None
+    }), 200
@@ -0,0 +1,144 @@
+"""
+Cercas virtuais (geofencing)
+"""
+
+from datetime import datetime
+
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+
+from models import db, Pet, GeofenceZone
+from routing import use_read_replica
+from caching import etagged
+
+bp = Blueprint('geofence', __name__)
+
+
+# ============================================
+# API - GEOFENCING (CERCAS VIRTUAIS)
+# ============================================
+
+@bp.route('/api/pets/<int:pet_id>/geofence', methods=['GET'])
+@login_required
+@use_read_replica
+@etagged
+def get_geofences(pet_id):
+    """Listar cercas virtuais do pet"""
+    pet = Pet.active().filter_by(id=pet_id, user_id=current_user.id).first()
+
+    if not pet:
+        return jsonify({'error': 'Pet não encontrado'}), 404
+
+    zones = GeofenceZone.query.filter_by(pet_id=pet_id).all()
+    return jsonify({
+        'zones': [zone.to_dict() for zone in zones]
+    }), 200
+
+
+@bp.route('/api/pets/<int:pet_id>/geofence', methods=['POST'])
+@login_required
+def create_geofence(pet_id):
+    """Criar cerca virtual para o pet"""
+    pet = Pet.active().filter_by(id=pet_id, user_id=current_user.id).first()
+
+    if not pet:
+        return jsonify({'error': 'Pet não encontrado'}), 404
+
+    data = request.json
+
+    if not all(k in data for k in ['name', 'center_lat', 'center_lng', 'radius_meters']):
+        return jsonify({'error': 'Dados incompletos'}), 400
+
+    zone = GeofenceZone(
+        pet_id=pet_id,
+        name=data['name'],
+        center_lat=float(data['center_lat']),
+        center_lng=float(data['center_lng']),
+        radius_meters=float(data['radius_meters'])
+    )
+
+    db.session.add(zone)
+    db.session.commit()
+
+    return jsonify({
+        'message': 'Cerca virtual criada com sucesso',
+        'zone': zone.to_dict()
+    }), 201
+
+
+@bp.route('/api/pets/<int:pet_id>/geofence/analysis', methods=['GET'])
+@login_required
+@use_read_replica
+@etagged
+def analyze_geofences(pet_id):
+    """
+    Avaliar cercas contra o histórico guardado do pet: quantas vezes e por
+    quanto tempo ele ficou fora. Cercas: ?zone_id= (pode repetir), uma cerca
+    em rascunho (center_lat, center_lng, radius_meters) ou, sem nada, as ativas.
+    """
+    pet = Pet.active().filter_by(id=pet_id, user_id=current_user.id).first()
+
+    if not pet:
+        return jsonify({'error': 'Pet não encontrado'}), 404
+
+    zone_ids = request.args.getlist('zone_id', type=int)
+    if 'radius_meters' in request.args:
+        try:
+            zones = [GeofenceZone(
+                pet_id=pet_id,
+                name=request.args.get('name', 'Rascunho'),
+                center_lat=float(request.args['center_lat']),
+                center_lng=float(request.args['center_lng']),
+                radius_meters=float(request.args['radius_meters'])
+            )]
+        except (KeyError, ValueError):
+            return jsonify({'error': 'Informe center_lat, center_lng e radius_meters'}), 400
+    elif zone_ids:
+        zones = GeofenceZone.query.filter(
+            GeofenceZone.pet_id == pet_id, GeofenceZone.id.in_(zone_ids)
+        ).all()
+        if len(zones) != len(set(zone_ids)):
+            return jsonify({'error': 'Cerca não encontrada'}), 404
+    else:
+        zones = GeofenceZone.query.filter_by(pet_id=pet_id, is_active=True).all()
+
+    try:
+        start, end = (
+            datetime.fromisoformat(value.replace('Z', '+00:00')) if value else None
+            for value in (request.args.get('start_date'), request.args.get('end_date'))
+        )
+    except ValueError:
+        return jsonify({'error': 'Data inválida (use ISO 8601)'}), 400
+
+    # NumPy só é carregado quando a análise é pedida
+    import geofence_analysis
+
+    return jsonify({
+        'pet_id': pet_id,
+        'results': geofence_analysis.analyze_zones(pet_id, zones, start, end)
+    }), 200
+
+
+@bp.route('/api/geofence/<int:zone_id>', methods=['DELETE'])
+@login_required
+def delete_geofence(zone_id):
+    """Deletar cerca virtual"""
+    # 1. Busca a cerca pelo ID
+    zone = GeofenceZone.query.get(zone_id)
+    
+    if not zone:
+        return jsonify({'error': 'Cerca não encontrada'}), 404
+
+    # 2. Busca o Pet dono da cerca para verificar permissão
+    pet = Pet.active().filter_by(id=zone.pet_id).first()
+
+    # 3. Verifica se o usuário logado é dono do Pet
+    # Isso impede que um usuário apague a cerca de outro
+    if not pet or pet.user_id != current_user.id:
+        return jsonify({'error': 'Acesso negado'}), 403
+
+    # 4. Deleta do banco
+    db.session.delete(zone)
+    db.session.commit()
+
+    return jsonify({'message': 'Cerca deletada com sucesso'}), 200
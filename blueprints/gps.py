@@ -0,0 +1,179 @@
+"""
+Ingestão de localização enviada pelo ESP32
+"""
+
+from datetime import datetime
+
+from flask import Blueprint, request, jsonify
+
+from models import db, Pet, Location, GeofenceZone, Alert
+from geo import haversine_distance, is_stationary, geohash_encode
+from reporting import next_report_interval
+import positions
+import ratelimit
+
+bp = Blueprint('gps', __name__)
+
+
+# ============================================
+# FUNÇÕES AUXILIARES
+# ============================================
+
+def optional_number(value, cast=float):
+    """Converte um campo opcional do ESP32, ignorando valores inválidos"""
+    try:
+        return cast(value) if value is not None else None
+    except (ValueError, TypeError):
+        return None
+
+
+def check_geofence_violations(pet_id, latitude, longitude, zones):
+    """Verifica se o pet saiu de alguma cerca virtual (`zones`: cercas ativas do pet)"""
+    alerts = []
+    for zone in zones:
+        distance = haversine_distance(
+            zone.center_lat, zone.center_lng,
+            latitude, longitude
+        )
+
+        if distance > zone.radius_meters:
+            # Pet saiu da cerca
+            alerts.append({
+                'pet_id': pet_id,
+                'alert_type': 'geofence',
+                'message': f'Seu pet saiu da zona "{zone.name}"!'
+            })
+
+    if alerts:
+        # Um INSERT só para todas as cercas
+        db.session.execute(db.insert(Alert), alerts)
+        db.session.commit()
+
+
+def check_battery_alert(pet_id, battery_level):
+    """Cria alerta se a bateria estiver baixa"""
+    if battery_level <= 20:
+        # Verifica se já existe alerta de bateria não lido
+        existing = Alert.query.filter_by(
+            pet_id=pet_id,
+            alert_type='battery',
+            is_read=False
+        ).first()
+
+        if not existing:
+            alert = Alert(
+                pet_id=pet_id,
+                alert_type='battery',
+                message=f'Bateria baixa: {battery_level}%'
+            )
+            db.session.add(alert)
+            db.session.commit()
+
+
+# ============================================
+# API - LOCALIZAÇÃO (ESP32)
+# ============================================
+
+@bp.route('/api/gps/update', methods=['POST'])
+def update_gps():
+    """
+    Endpoint para o ESP32 enviar dados de localização
+    """
+    data = request.json
+
+    # Validar API key
+    api_key = data.get('api_key')
+    if not api_key:
+        return jsonify({'error': 'API key não fornecida'}), 401
+
+    # Limite por dispositivo, antes de qualquer consulta ao banco
+    retry_after = ratelimit.ingest_retry_after(api_key)
+    if retry_after:
+        response = jsonify({
+            'error': 'Envios acima do limite do dispositivo',
+            'next_interval_s': retry_after
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+
+    pet = Pet.active().filter_by(api_key=api_key).first()
+    if not pet:
+        return jsonify({'error': 'API key inválida'}), 401
+    ratelimit.device_validated(api_key)
+
+    # Validar dados obrigatórios
+    if 'latitude' not in data or 'longitude' not in data:
+        return jsonify({'error': 'Latitude e longitude são obrigatórios'}), 400
+
+    try:
+        latitude = float(data['latitude'])
+        longitude = float(data['longitude'])
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Coordenadas inválidas'}), 400
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return jsonify({'error': 'Coordenadas inválidas'}), 400
+
+    speed = optional_number(data.get('speed'))
+    hdop = optional_number(data.get('hdop'))
+    satellites = optional_number(data.get('satellites'), int)
+    now = datetime.utcnow()
+
+    # Último fix aceito do pet: se o novo for só ruído em volta dele,
+    # não grava uma linha nova, apenas estende a permanência
+    anchor = Location.query.filter_by(pet_id=pet.id).order_by(Location.timestamp.desc()).first()
+
+    stationary = is_stationary(anchor, latitude, longitude, speed, hdop, satellites, now)
+    if stationary:
+        location = anchor
+        location.dwell_count = (location.dwell_count or 1) + 1
+        location.dwell_until = now
+    else:
+        # Criar registro de localização
+        location = Location(
+            pet_id=pet.id,
+            latitude=latitude,
+            longitude=longitude,
+            altitude=optional_number(data.get('altitude')),
+            speed=speed,
+            satellites=satellites,
+            hdop=hdop,
+            timestamp=now
+        )
+        db.session.add(location)
+
+    # Atualizar status do pet
+    pet.is_online = True
+    pet.last_seen = now
+
+    # Índice espacial: última posição aceita (a do registro que ficou no histórico)
+    pet.last_latitude = location.latitude
+    pet.last_longitude = location.longitude
+    pet.geohash = geohash_encode(location.latitude, location.longitude)
+
+    if 'battery' in data:
+        pet.battery_level = int(data['battery'])
+        check_battery_alert(pet.id, pet.battery_level)
+
+    db.session.commit()
+
+    # Os outros workers leem a última posição daqui, sem ir ao banco
+    positions.remember(pet, location)
+
+    # Intervalo calculado antes do commit dos alertas, que expira as cercas
+    # (recarregá-las seria uma consulta por cerca)
+    zones = GeofenceZone.query.filter_by(pet_id=pet.id, is_active=True).all()
+    watched = pet.watched_until is not None and pet.watched_until > now
+    next_interval = next_report_interval(
+        speed, stationary, pet.battery_level, zones, latitude, longitude, watched
+    )
+
+    # Verificar cercas virtuais
+    location_id = location.id
+    check_geofence_violations(pet.id, latitude, longitude, zones)
+
+    return jsonify({
+        'message': 'Localização atualizada com sucesso',
+        'location_id': location_id,
+        'next_interval_s': next_interval
+    }), 200
@@ -0,0 +1,44 @@
+"""
+Páginas HTML do painel
+"""
+
+from flask import Blueprint, render_template, redirect, url_for
+from flask_login import login_required, current_user
+
+bp = Blueprint('pages', __name__)
+
+
+@bp.route('/')
+def index():
+    if current_user.is_authenticated:
+        return redirect(url_for('pages.dashboard'))
+    return redirect(url_for('auth.login'))
+
+
+# ============================================
+# ROTAS DO DASHBOARD
+# ============================================
+
+@bp.route('/dashboard')
+@login_required
+def dashboard():
+    return render_template('home_pets_web.html')
+
+
+@bp.route('/mapa')
+@bp.route('/mapa/<int:pet_id>')
+@login_required
+def mapa(pet_id=None):
+    return render_template('mapa_web.html')
+
+
+@bp.route('/adicionar-pet')
+@login_required
+def adicionar_pet():
+    return render_template('adicionar_pet_web.html')
+
+
+@bp.route('/perfil')
+@login_required
+def perfil():
+    return render_template('perfil_web.html')
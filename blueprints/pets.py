@@ -0,0 +1,558 @@
+"""
+Pets e consulta de localização/histórico
+"""
+
+import secrets
+from datetime import datetime, timedelta, timezone
+from math import ceil, isfinite
+
+from flask import Blueprint, current_app, request, jsonify
+from flask_login import login_required, current_user
+from sqlalchemy import and_, or_, case, func
+
+from models import db, Pet, Location, PetTombstone
+from routing import use_read_replica
+from caching import etagged
+import positions
+import purge
+import compact
+import ratelimit
+from epoch import to_epoch_us
+from geo import haversine_distance, bbox_around, geohash_cover, cluster_precision, GEOHASH_PRECISION
+
+bp = Blueprint('pets', __name__)
+
+HISTORY_FORMATS = ('objects', 'polyline', 'columns')
+MAX_ZOOM = 30  # zoom do mapa aceito em /api/pets/clusters
+
+
+# ============================================
+# FUNÇÕES AUXILIARES
+# ============================================
+
+def requested_fields():
+    """Campos pedidos em ?fields=a,b,c (None = todos)"""
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return {field.strip() for field in fields.split(',') if field.strip()}
+
+
+def parse_coordinate(value, limit):
+    """Latitude (limit=90) ou longitude (limit=180) finita na faixa (ValueError se inválida)"""
+    number = float(value)
+    if not isfinite(number) or not -limit <= number <= limit:
+        raise ValueError
+    return number
+
+
+def parse_bbox(value):
+    """
+    ?bbox=min_lat,min_lng,max_lat,max_lng (ValueError se inválido). As
+    longitudes podem passar de ±180 (mapa "dando a volta"), até uma volta a mais.
+    """
+    parts = value.split(',')
+    if len(parts) != 4:
+        raise ValueError
+    min_lat, max_lat = parse_coordinate(parts[0], 90), parse_coordinate(parts[2], 90)
+    min_lng, max_lng = parse_coordinate(parts[1], 540), parse_coordinate(parts[3], 540)
+    if min_lat > max_lat or min_lng > max_lng:
+        raise ValueError
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def bbox_filter(min_lat, min_lng, max_lat, max_lng):
+    """
+    Condição SQL da última posição do pet dentro do retângulo: células
+    geohash (índice user_id + geohash) e depois as coordenadas exatas. O
+    retângulo pode passar de ±180 (mapa "dando a volta").
+    """
+    cells = geohash_cover(min_lat, min_lng, max_lat, max_lng)
+    conditions = [
+        or_(*[and_(Pet.geohash >= cell, Pet.geohash < cell + '~') for cell in cells]),
+        Pet.last_latitude.between(min_lat, max_lat),
+    ]
+    if max_lng - min_lng < 360:
+        west = (min_lng + 180) % 360 - 180
+        east = (max_lng + 180) % 360 - 180
+        if west <= east:
+            conditions.append(Pet.last_longitude.between(west, east))
+        else:
+            conditions.append(or_(Pet.last_longitude >= west, Pet.last_longitude <= east))
+    return and_(*conditions)
+
+
+def parse_version(value):
+    """Converte uma versão ISO 8601 (ex: ?since=) em datetime UTC ingênuo"""
+    version = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if version.tzinfo is not None:
+        version = version.astimezone(timezone.utc).replace(tzinfo=None)
+    return version
+
+
+# ============================================
+# API - PETS
+# ============================================
+
+@bp.route('/api/pets', methods=['GET'])
+@login_required
+@use_read_replica
+@etagged
+def get_pets():
+    """
+    Listar todos os pets do usuário
+
+    ?since=<versão> devolve só os pets alterados depois dessa versão e os ids
+    dos pets deletados; ?fields=a,b limita os campos de cada pet. A busca
+    volta PETS_SYNC_OVERLAP segundos antes da versão, então o cliente pode
+    receber de novo pets (e ids deletados) que já tinha.
+    """
+    fields = requested_fields()
+    query = Pet.active().filter_by(user_id=current_user.id)
+    response = {}
+    versions = []
+
+    since = request.args.get('since')
+    if since:
+        try:
+            since = parse_version(since)
+            overlap = since - timedelta(seconds=current_app.config['PETS_SYNC_OVERLAP'])
+        except (ValueError, OverflowError):
+            return jsonify({'error': 'Versão inválida'}), 400
+
+        query = query.filter(Pet.updated_at > overlap)
+        tombstones = PetTombstone.query.filter(
+            PetTombstone.user_id == current_user.id,
+            PetTombstone.deleted_at > overlap
+        ).all()
+        response['deleted'] = [t.pet_id for t in tombstones]
+        versions = [since] + [t.deleted_at for t in tombstones]
+
+    pets = query.all()
+    versions += [pet.updated_at for pet in pets if pet.updated_at]
+
+    last_locations = Pet.last_location_dicts(pets) if fields is None or 'last_location' in fields else None
+    response['pets'] = [
+        pet.to_dict(include_last_location=True, fields=fields, last_locations=last_locations) for pet in pets
+    ]
+    response['version'] = max(versions) if versions else None
+    return jsonify(response), 200
+
+
+@bp.route('/api/pets/nearby', methods=['GET'])
+@login_required
+@use_read_replica
+@etagged
+def get_nearby_pets():
+    """
+    Pets do usuário perto de um ponto: ?lat=&lng=&radius=<metros> ou
+    ?bbox=min_lat,min_lng,max_lat,max_lng
+
+    Filtra primeiro pelas células geohash que cobrem a área (índice
+    user_id + geohash) e depois confere a distância/retângulo exato.
+    """
+    fields = requested_fields()
+    config = current_app.config
+    center = None
+
+    try:
+        if request.args.get('bbox'):
+            min_lat, min_lng, max_lat, max_lng = parse_bbox(request.args['bbox'])
+            radius = None
+        else:
+            center = (parse_coordinate(request.args['lat'], 90), parse_coordinate(request.args['lng'], 180))
+            radius = float(request.args.get('radius', config['NEARBY_DEFAULT_RADIUS']))
+            if not 0 < radius <= config['NEARBY_MAX_RADIUS']:
+                return jsonify({'error': f'Raio deve estar entre 0 e {config["NEARBY_MAX_RADIUS"]} metros'}), 400
+            min_lat, min_lng, max_lat, max_lng = bbox_around(*center, radius)
+    except (KeyError, ValueError):
+        return jsonify({'error': 'Informe lat, lng e radius ou bbox=min_lat,min_lng,max_lat,max_lng'}), 400
+
+    cells = geohash_cover(min_lat, min_lng, max_lat, max_lng)
+    candidates = Pet.active().filter(
+        Pet.user_id == current_user.id,
+        or_(*[and_(Pet.geohash >= cell, Pet.geohash < cell + '~') for cell in cells])
+    ).all()
+
+    results = []
+    for pet in candidates:
+        if center is not None:
+            distance = haversine_distance(center[0], center[1], pet.last_latitude, pet.last_longitude)
+            if distance > radius:
+                continue
+        else:
+            distance = None
+            if not min_lat <= pet.last_latitude <= max_lat:
+                continue
+            # Longitude normalizada para o retângulo (que pode passar de ±180)
+            lng = pet.last_longitude
+            if lng < min_lng:
+                lng += 360
+            elif lng > max_lng:
+                lng -= 360
+            if not min_lng <= lng <= max_lng:
+                continue
+
+        item = pet.to_dict(fields=fields)
+        item['latitude'] = pet.last_latitude
+        item['longitude'] = pet.last_longitude
+        item['distance'] = distance
+        results.append(item)
+
+    if center is not None:
+        results.sort(key=lambda item: item['distance'])
+
+    return jsonify({'pets': results, 'total': len(results)}), 200
+
+
+@bp.route('/api/pets/clusters', methods=['GET'])
+@login_required
+@use_read_replica
+@etagged
+def get_pet_clusters():
+    """
+    Pets do usuário na área visível do mapa, agrupados numa grade:
+    ?bbox=min_lat,min_lng,max_lat,max_lng&zoom=<zoom do Leaflet>
+
+    A grade são os prefixos do geohash da última posição, numa precisão que
+    depende do zoom, e o agrupamento é feito no banco (GROUP BY). A resposta
+    cresce com a área visível, não com o número de pets. A partir de
+    CLUSTER_PETS_ZOOM vêm os pets individuais (até CLUSTER_MAX_PETS).
+    """
+    config = current_app.config
+    try:
+        min_lat, min_lng, max_lat, max_lng = parse_bbox(request.args['bbox'])
+        zoom = int(request.args['zoom'])
+        if not 0 <= zoom <= MAX_ZOOM:
+            raise ValueError
+    except (KeyError, ValueError):
+        return jsonify({'error': 'Informe bbox=min_lat,min_lng,max_lat,max_lng e zoom'}), 400
+
+    in_view = Pet.active().filter(
+        Pet.user_id == current_user.id,
+        bbox_filter(min_lat, min_lng, max_lat, max_lng)
+    )
+
+    if zoom >= config['CLUSTER_PETS_ZOOM']:
+        pets = in_view.limit(config['CLUSTER_MAX_PETS'] + 1).all()
+        if len(pets) <= config['CLUSTER_MAX_PETS']:
+            fields = requested_fields()
+            items = []
+            for pet in pets:
+                item = pet.to_dict(fields=fields)
+                item['latitude'] = pet.last_latitude
+                item['longitude'] = pet.last_longitude
+                items.append(item)
+            return jsonify({'zoom': zoom, 'clusters': [], 'pets': items, 'total': len(items)}), 200
+        # Pets demais no mesmo lugar: continua agrupando, na grade mais fina
+        precision = GEOHASH_PRECISION
+    else:
+        precision = cluster_precision(zoom, config['CLUSTER_CELL_PIXELS'])
+
+    cell = func.substr(Pet.geohash, 1, precision)
+    low_battery = config['REPORT_LOW_BATTERY']
+    rows = in_view.with_entities(
+        cell.label('cell'),
+        func.count(Pet.id),
+        func.min(Pet.id),
+        func.avg(Pet.last_latitude),
+        func.avg(Pet.last_longitude),
+        func.min(Pet.last_latitude),
+        func.min(Pet.last_longitude),
+        func.max(Pet.last_latitude),
+        func.max(Pet.last_longitude),
+        func.sum(case((Pet.is_online.is_(True), 1), else_=0)),
+        func.min(Pet.battery_level),
+        func.avg(Pet.battery_level),
+        func.sum(case((Pet.battery_level <= low_battery, 1), else_=0)),
+    ).group_by(cell).all()
+
+    clusters = []
+    for (cell_hash, count, first_id, latitude, longitude, south, west, north, east,
+         online, battery_min, battery_avg, battery_low) in rows:
+        clusters.append({
+            'cell': cell_hash,
+            'count': count,
+            'pet_id': first_id if count == 1 else None,
+            'latitude': latitude,
+            'longitude': longitude,
+            'bbox': [south, west, north, east],
+            'online': int(online or 0),
+            'battery_min': battery_min,
+            'battery_avg': round(float(battery_avg), 1) if battery_avg is not None else None,
+            'low_battery': int(battery_low or 0)
+        })
+
+    return jsonify({
+        'zoom': zoom,
+        'precision': precision,
+        'clusters': clusters,
+        'pets': [],
+        'total': sum(cluster['count'] for cluster in clusters)
+    }), 200
+
+
+@bp.route('/api/pets/<int:pet_id>', methods=['GET'])
+@login_required
+def get_pet(pet_id):
+    """Obter detalhes de um pet específico"""
+    pet = Pet.active().filter_by(id=pet_id, user_id=current_user.id).first()
+
+    if not pet:
+        return jsonify({'error': 'Pet não encontrado'}), 404
+
+    return jsonify(pet.to_dict(include_last_location=True, fields=requested_fields())), 200
+
+
+@bp.route('/api/pets', methods=['POST'])
+@login_required
+def create_pet():
+    """Criar novo pet"""
+    data = request.json
+
+    if not data.get('name'):
+        return jsonify({'error': 'Nome do pet é obrigatório'}), 400
+
+    # Gerar device_id e api_key únicos
+    device_id = f"ESP32_{secrets.token_hex(6).upper()}"
+    api_key = secrets.token_urlsafe(32)
+
+    pet = Pet(
+        name=data['name'],
+        species=data.get('species', 'Cachorro'),
+        breed=data.get('breed', ''),
+        photo_url=data.get('photo_url', ''),
+        device_id=device_id,
+        api_key=api_key,
+        user_id=current_user.id
+    )
+
+    db.session.add(pet)
+    db.session.commit()
+
+    return jsonify({
+        'message': 'Pet criado com sucesso',
+        'pet': pet.to_dict(),
+        'api_key': api_key,  # Mostrar apenas na criação
+        'device_id': device_id
+    }), 201
+
+
+@bp.route('/api/pets/<int:pet_id>', methods=['PUT'])
+@login_required
+def update_pet(pet_id):
+    """Atualizar dados do pet"""
+    pet = Pet.active().filter_by(id=pet_id, user_id=current_user.id).first()
+
+    if not pet:
+        return jsonify({'error': 'Pet não encontrado'}), 404
+
+    data = request.json
+
+    if 'name' in data:
+        pet.name = data['name']
+    if 'species' in data:
+        pet.species = data['species']
+    if 'breed' in data:
+        pet.breed = data['breed']
+    if 'photo_url' in data:
+        pet.photo_url = data['photo_url']
+
+    db.session.commit()
+
+    return jsonify({
+        'message': 'Pet atualizado com sucesso',
+        'pet': pet.to_dict()
+    }), 200
+
+
+@bp.route('/api/pets/<int:pet_id>', methods=['DELETE'])
+@login_required
+def delete_pet(pet_id):
+    """Deletar pet"""
+    pet = Pet.active().filter_by(id=pet_id, user_id=current_user.id).first()
+
+    if not pet:
+        return jsonify({'error': 'Pet não encontrado'}), 404
+
+    # O pet some da API agora; localizações, alertas e cercas são apagados
+    # em segundo plano (purge.py)
+    now = datetime.utcnow()
+    pet.deleted_at = now
+    pet.api_key = None
+    db.session.add(PetTombstone(pet_id=pet.id, user_id=pet.user_id, deleted_at=now))
+    db.session.commit()
+    positions.forget(pet_id)
+
+    purge.start_purge(pet_id)
+
+    return jsonify({
+        'message': 'Pet deletado com sucesso',
+        'deletion': f'/api/pets/{pet_id}/deletion'
+    }), 200
+
+
+@bp.route('/api/pets/<int:pet_id>/deletion', methods=['GET'])
+@login_required
+def get_pet_deletion(pet_id):
+    """Progresso da remoção de um pet deletado"""
+    tombstone = PetTombstone.query.filter_by(pet_id=pet_id, user_id=current_user.id).order_by(
+        PetTombstone.deleted_at.desc()
+    ).first()
+
+    if not tombstone:
+        return jsonify({'error': 'Remoção não encontrada'}), 404
+
+    return jsonify(tombstone.to_dict()), 200
+
+
+# ============================================
+# API - CONSULTA DE LOCALIZAÇÃO
+# ============================================
+
+@bp.route('/api/pets/<int:pet_id>/device', methods=['GET'])
+@login_required
+def get_pet_device(pet_id):
+    """Estado do rastreador do pet, incluindo fixes recusados pelo limite de envios"""
+    pet = Pet.active().filter_by(id=pet_id, user_id=current_user.id).first()
+
+    if not pet:
+        return jsonify({'error': 'Pet não encontrado'}), 404
+
+    return jsonify({
+        'device_id': pet.device_id,
+        'is_online': pet.is_online,
+        'last_seen': pet.last_seen,
+        'battery_level': pet.battery_level,
+        'rejected_fixes': ratelimit.rejected_fixes(pet.api_key)
+    }), 200
+
+
+@bp.route('/api/pets/<int:pet_id>/location', methods=['GET'])
+@login_required
+def get_pet_location(pet_id):
+    """Obter última localização do pet"""
+    pet = Pet.active().filter_by(id=pet_id, user_id=current_user.id).first()
+
+    if not pet:
+        return jsonify({'error': 'Pet não encontrado'}), 404
+
+    # Memória compartilhada: sem consultar as localizações
+    cached = positions.latest(pet.id, pet.user_id, pet.created_at)
+    if cached:
+        return jsonify(cached['location']), 200
+
+    location = Location.query.filter_by(pet_id=pet_id).order_by(Location.timestamp.desc()).first()
+
+    if not location:
+        return jsonify({'error': 'Nenhuma localização registrada'}), 404
+
+    positions.remember(pet, location, only_if_newer=True)
+    return jsonify(location.to_dict()), 200
+
+
+@bp.route('/api/pets/<int:pet_id>/history', methods=['GET'])
+@login_required
+@use_read_replica
+@etagged
+def get_pet_history(pet_id):
+    """Obter histórico de localizações do pet"""
+    pet = Pet.active().filter_by(id=pet_id, user_id=current_user.id).first()
+
+    if not pet:
+        return jsonify({'error': 'Pet não encontrado'}), 404
+
+    # Parâmetros de paginação e filtros
+    page = request.args.get('page', 1, type=int)
+    limit = request.args.get('limit', current_app.config['LOCATIONS_PER_PAGE'], type=int)
+    start_date = request.args.get('start_date')  # ISO format
+    end_date = request.args.get('end_date')
+    history_format = request.args.get('format', 'objects')  # objects, polyline ou columns
+    fields = requested_fields()
+
+    if history_format not in HISTORY_FORMATS:
+        return jsonify({'error': f'Formato inválido (use {", ".join(HISTORY_FORMATS)})'}), 400
+    if history_format == 'columns' and fields is not None and not fields & set(compact.COLUMNS):
+        return jsonify({'error': 'Nenhum campo válido em fields'}), 400
+
+    query = Location.query.filter_by(pet_id=pet_id)
+    start = end = None
+
+    # Filtros de data
+    if start_date:
+        try:
+            start = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
+            query = query.filter(Location.timestamp >= start)
+        except ValueError:
+            pass
+
+    if end_date:
+        try:
+            end = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+            query = query.filter(Location.timestamp <= end)
+        except ValueError:
+            pass
+
+    config = current_app.config
+    page = max(page, 1)
+    if limit < 1:
+        limit = config['LOCATIONS_PER_PAGE']
+    max_limit = config['HISTORY_MAX_LIMIT'] if history_format == 'objects' else config['HISTORY_COMPACT_MAX_LIMIT']
+    if limit > max_limit:
+        return jsonify({'error': f'limit deve ser no máximo {max_limit} (format={history_format})'}), 400
+    offset = (page - 1) * limit
+
+    import archive
+
+    # As localizações arquivadas são sempre mais antigas que as da tabela,
+    # então a ordem decrescente é: tabela primeiro, arquivo depois
+    live_total = query.count()
+    total = live_total + archive.count_archived(pet_id, start, end)
+    paging = {
+        'total': total,
+        'pages': ceil(total / limit) if total else 0,
+        'current_page': page
+    }
+
+    if history_format != 'objects':
+        # Formatos compactos: só as colunas necessárias, sem objetos do ORM
+        if history_format == 'polyline':
+            names = ['latitude', 'longitude']
+        else:
+            names = [name for name in compact.COLUMNS if fields is None or name in fields]
+
+        columns = {name: [] for name in names}
+        if offset < live_total:
+            rows = query.with_entities(*[getattr(Location, name) for name in names]).order_by(
+                Location.timestamp.desc()
+            ).offset(offset).limit(limit).all()
+            for name, values in zip(names, zip(*rows)):
+                columns[name].extend(
+                    [None if value is None else to_epoch_us(value) for value in values] if name in ('timestamp', 'dwell_until') else values
+                )
+
+        fetched = len(columns[names[0]])
+        if fetched < limit:
+            archived = archive.read_archived_columns(
+                pet_id, max(0, offset - live_total), limit - fetched, names, start, end
+            )
+            for name in names:
+                columns[name].extend(archived[name])
+
+        if history_format == 'polyline':
+            payload = compact.polyline_payload(columns)
+        else:
+            payload = compact.columns_payload(columns)
+        return jsonify({**payload, 'count': len(columns[names[0]]), **paging}), 200
+
+    items = []
+    if offset < live_total:
+        locations = query.order_by(Location.timestamp.desc()).offset(offset).limit(limit).all()
+        items = [loc.to_dict() for loc in locations]
+
+    if len(items) < limit:
+        items.extend(archive.read_archived(
+            pet_id, max(0, offset - live_total), limit - len(items), start, end
+        ))
+
+    return jsonify({'locations': items, **paging}), 200
@@ -0,0 +1,114 @@
+"""
+Tempo real (Server-Sent Events)
+"""
+
+import time
+from datetime import datetime, timedelta
+
+from flask import Blueprint, current_app, request, jsonify, Response, stream_with_context
+from flask_login import login_required, current_user
+from sqlalchemy import update
+
+from models import db, Pet, Location
+from routing import use_read_replica
+import compact
+import positions
+
+bp = Blueprint('stream', __name__)
+
+
+def mark_watched(pet_id):
+    """Marca que há alguém acompanhando o pet: o ESP32 passa a enviar mais rápido"""
+    until = datetime.utcnow() + timedelta(seconds=current_app.config['REPORT_WATCH_TTL'])
+    # updated_at fica igual: não é uma alteração do pet para a sincronização
+    db.session.execute(
+        update(Pet).where(Pet.id == pet_id).values(watched_until=until, updated_at=Pet.updated_at)
+    )
+    db.session.commit()
+
+
+def new_location(pet_id, user_id, created_at, last_location_id):
+    """Localização mais nova que last_location_id, com a bateria, ou None"""
+    # Memória compartilhada primeiro: sem consulta enquanto o pet estiver lá
+    cached = positions.latest(pet_id, user_id, created_at)
+    if cached:
+        if cached['location']['id'] <= last_location_id:
+            return None
+        return dict(cached['location'], battery_level=cached['battery_level'])
+
+    # Buscar nova localização
+    location = Location.query.filter(
+        Location.pet_id == pet_id,
+        Location.id > last_location_id
+    ).order_by(Location.timestamp.desc()).first()
+
+    if not location:
+        return None
+
+    # BATERIA: Consulta direto do banco para garantir que é a mais recente
+    current_battery = db.session.query(Pet.battery_level).filter(Pet.id == pet_id).scalar()
+
+    # Monta o pacote de dados com localização E bateria
+    data_dict = location.to_dict()
+    data_dict['battery_level'] = current_battery
+    return data_dict
+
+
+# ============================================
+# SERVER-SENT EVENTS (TEMPO REAL) - ATUALIZADO
+# ============================================
+
+@bp.route('/api/pets/<int:pet_id>/stream')
+@login_required
+@use_read_replica
+def stream_pet_location(pet_id):
+    """Stream de localização em tempo real usando SSE"""
+    pet = Pet.active().filter_by(id=pet_id, user_id=current_user.id).first()
+
+    if not pet:
+        return jsonify({'error': 'Pet não encontrado'}), 404
+
+    # format=polyline: cada evento leva só a diferença para o ponto anterior
+    # (compact.py). O primeiro evento de cada conexão é absoluto e vem com
+    # "reset": true, já que o navegador reconecta o EventSource sozinho e o
+    # decodificador do cliente precisa recomeçar do zero.
+    polyline = request.args.get('format') == 'polyline'
+
+    # A sessão expira o pet a cada rollback: guarda o que a leitura do slot confere
+    user_id, created_at = pet.user_id, pet.created_at
+
+    def generate():
+        last_location_id = 0
+        last_point = (0, 0)
+        first = True
+        last_mark = 0
+        while True:
+            # Renova a marcação antes de ela expirar
+            if time.monotonic() - last_mark >= current_app.config['REPORT_WATCH_TTL'] / 2:
+                mark_watched(pet_id)
+                last_mark = time.monotonic()
+
+            data_dict = new_location(pet_id, user_id, created_at, last_location_id)
+            if data_dict:
+                last_location_id = data_dict['id']
+                if polyline:
+                    encoded, last_point = compact.encode_polyline(
+                        [data_dict['latitude']], [data_dict['longitude']], start=last_point
+                    )
+                    data_dict = {
+                        'id': data_dict['id'],
+                        'timestamp': data_dict['timestamp'],
+                        'battery_level': data_dict['battery_level'],
+                        'polyline': encoded,
+                        'reset': first
+                    }
+                    first = False
+                data = current_app.json.dumps(data_dict)
+                yield f"data: {data}\n\n"
+
+            # Encerra a transação de leitura para enxergar os dados novos na próxima volta
+            db.session.rollback()
+            time.sleep(2)  # Verificar a cada 2 segundos
+
+    # stream_with_context mantém o contexto (sessão do banco, réplica) durante o stream
+    return Response(stream_with_context(generate()), mimetype='text/event-stream')
@@ -0,0 +1,31 @@
+"""
+ETag nas respostas de leitura da API (revalidação com 304)
+
+Rotas marcadas com @etagged recebem um ETag fraco calculado sobre o corpo
+JSON e `Cache-Control: private, no-cache`: o navegador guarda a resposta e,
+na próxima vez, pergunta com If-None-Match. Se nada mudou, a resposta é
+304 sem corpo, economizando a transferência (as consultas ainda rodam,
+já que o ETag vem do próprio conteúdo). O fetch do api.js faz isso sozinho.
+
+O ETag é fraco porque compression.py comprime o corpo depois: o conteúdo é
+o mesmo, mas os bytes enviados dependem do Accept-Encoding.
+"""
+
+from functools import wraps
+
+from flask import make_response, request
+
+
+def etagged(view):
+    """Decorador para rotas GET que devolvem JSON"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        response = make_response(view(*args, **kwargs))
+        if response.status_code != 200 or response.is_streamed:
+            return response
+
+        response.add_etag(weak=True)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    return wrapper
@@ -0,0 +1,115 @@
+"""
+Comandos de linha de comando (flask <comando>)
+
+Os módulos pesados (arquivo colunar/numpy, esquema) só são importados
+quando o comando correspondente é executado.
+"""
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from models import db, User
+import positions
+
+
+@click.command('init-db')
+@with_appcontext
+def init_db():
+    """Criar as tabelas do banco de dados"""
+    db.create_all()
+    # Últimas posições gravadas para um banco anterior não valem para este
+    positions.clear(current_app)
+    print('Banco de dados criado!')
+
+
+@click.command('upgrade-db')
+@with_appcontext
+def upgrade_db():
+    """Adicionar tabelas e colunas novas num banco já existente"""
+    import schema
+
+    changes = schema.upgrade_schema()
+    print(f'Banco atualizado: {", ".join(changes) if changes else "nada a fazer"}')
+
+
+@click.command('archive-locations')
+@with_appcontext
+def archive_locations():
+    """Mover localizações antigas para o arquivo colunar"""
+    import archive
+
+    total = archive.archive_cold_locations()
+    print(f'{total} localizações arquivadas em {current_app.config["ARCHIVE_FOLDER"]}')
+
+
+@click.command('purge-deleted-pets')
+@with_appcontext
+def purge_deleted_pets():
+    """Terminar a remoção de pets deletados que ficou pendente"""
+    import purge
+
+    for pet_id in purge.pending_pet_ids():
+        total = purge.purge_pet(pet_id)
+        print(f'Pet {pet_id}: {total} linhas apagadas')
+
+
+@click.command('analyze-geofence')
+@click.argument('pet_id', type=int)
+@click.option('--zone', 'zone_ids', type=int, multiple=True, help='Id da cerca (padrão: as ativas do pet)')
+@click.option('--start', type=click.DateTime(), help='Início do histórico (UTC)')
+@click.option('--end', type=click.DateTime(), help='Fim do histórico (UTC)')
+@click.option('--intervals', is_flag=True, help='Listar os intervalos fora da cerca')
+@with_appcontext
+def analyze_geofence(pet_id, zone_ids, start, end, intervals):
+    """Avaliar cercas contra o histórico guardado do pet"""
+    import geofence_analysis
+    from models import GeofenceZone
+
+    query = GeofenceZone.query.filter_by(pet_id=pet_id)
+    if zone_ids:
+        query = query.filter(GeofenceZone.id.in_(zone_ids))
+    else:
+        query = query.filter_by(is_active=True)
+
+    for result in geofence_analysis.analyze_zones(pet_id, query.all(), start, end):
+        zone = result['zone']
+        print(
+            f'Cerca {zone["id"]} ({zone["name"]}): {result["exits"]} saídas, '
+            f'{result["time_outside_s"] / 3600:.1f} h fora de {result["time_observed_s"] / 3600:.1f} h '
+            f'({result["outside_ratio"]:.1%}), {result["fixes"]} fixes'
+        )
+        if intervals:
+            for interval in result['intervals']:
+                print(f'  {interval["exit"]} -> {interval["enter"] or "(ainda fora)"}: {interval["duration_s"] / 60:.1f} min')
+
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets():
+    """Gerar os arquivos estáticos com hash e pré-comprimidos (static/dist)"""
+    import assets
+
+    manifest = assets.build_assets(current_app.static_folder)
+    print(f'{len(manifest)} arquivos gerados em static/{assets.DIST_FOLDER}')
+
+
+@click.command('create-test-user')
+@with_appcontext
+def create_test_user():
+    """Criar usuário de teste"""
+    user = User(name='Teste', email='teste@teste.com')
+    user.set_password('123456')
+    db.session.add(user)
+    db.session.commit()
+    print(f'Usuário de teste criado! Email: teste@teste.com, Senha: 123456')
+
+
+COMMANDS = (
+    init_db, upgrade_db, archive_locations, purge_deleted_pets, analyze_geofence, build_assets, create_test_user
+)
+
+
+def register_commands(app):
+    for command in COMMANDS:
+        app.cli.add_command(command)
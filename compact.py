@@ -0,0 +1,77 @@
+"""
+Formatos compactos de localizações (histórico e stream)
+
+- polyline: só as coordenadas, no "encoded polyline algorithm" (Google):
+  cada ponto é a diferença para o anterior, com 5 casas decimais (~1 m),
+  em texto ASCII. É o que o mapa precisa para desenhar o trajeto.
+- columns: listas paralelas por campo, em vez de um objeto por localização.
+  `timestamp` vem em milissegundos desde a época, com o primeiro valor
+  absoluto e os seguintes como diferença para o anterior. Um campo sem
+  nenhum valor na página (ex: altitude) vem como null em vez de uma lista.
+
+static/map.js tem os decodificadores (decodePolyline, decodeColumns).
+"""
+
+POLYLINE_PRECISION = 5
+
+# Campos do formato columns, na ordem de Location.to_dict
+COLUMNS = (
+    'id', 'latitude', 'longitude', 'altitude', 'speed',
+    'satellites', 'hdop', 'timestamp', 'dwell_count', 'dwell_until'
+)
+
+def _encode_value(value, out):
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        out.append(chr((0x20 | (value & 0x1f)) + 63))
+        value >>= 5
+    out.append(chr(value + 63))
+
+
+def encode_polyline(latitudes, longitudes, precision=POLYLINE_PRECISION, start=(0, 0)):
+    """
+    Codifica as coordenadas. `start` é o último ponto já enviado (em inteiros
+    da precisão), para continuar uma sequência. Retorna (texto, último ponto).
+    """
+    factor = 10 ** precision
+    out = []
+    prev_lat, prev_lng = start
+    for latitude, longitude in zip(latitudes, longitudes):
+        lat = round(latitude * factor)
+        lng = round(longitude * factor)
+        _encode_value(lat - prev_lat, out)
+        _encode_value(lng - prev_lng, out)
+        prev_lat, prev_lng = lat, lng
+    return ''.join(out), (prev_lat, prev_lng)
+
+
+def delta_encode(values):
+    """Primeiro valor absoluto, depois diferenças para o anterior"""
+    encoded = []
+    previous = 0
+    for value in values:
+        encoded.append(value - previous)
+        previous = value
+    return encoded
+
+
+def polyline_payload(columns):
+    polyline, _ = encode_polyline(columns['latitude'], columns['longitude'])
+    return {'polyline': polyline, 'precision': POLYLINE_PRECISION}
+
+
+def columns_payload(columns):
+    """
+    Colunas (listas) no formato da resposta. timestamp/dwell_until chegam em
+    microssegundos e saem em milissegundos.
+    """
+    payload = {}
+    for name, values in columns.items():
+        if name == 'timestamp':
+            values = delta_encode([value // 1000 for value in values])
+        elif name == 'dwell_until':
+            values = [None if value is None else value // 1000 for value in values]
+        elif name == 'dwell_count':
+            values = [value or 1 for value in values]
+        payload[name] = None if all(value is None for value in values) else values
+    return {'columns': payload}
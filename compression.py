@@ -0,0 +1,69 @@
+"""
+Compressão das respostas (gzip/brotli) negociada pelo Accept-Encoding
+
+Só comprime respostas completas (não streams/SSE), com tipo textual e
+tamanho acima de COMPRESS_MIN_SIZE. O brotli é usado quando o pacote
+`brotli` estiver instalado e o cliente aceitar `br`.
+"""
+
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # opcional
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'text/javascript',
+    'text/html',
+    'text/css',
+    'text/plain',
+    'image/svg+xml',
+}
+
+
+def choose_encoding(accept_encodings):
+    """Escolhe 'br', 'gzip' ou None a partir do Accept-Encoding do cliente"""
+    if brotli is not None and accept_encodings['br'] > 0:
+        return 'br'
+    if accept_encodings['gzip'] > 0:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['COMPRESS_BROTLI_QUALITY'])
+    return gzip.compress(data, compresslevel=config['COMPRESS_GZIP_LEVEL'], mtime=0)
+
+
+def init_app(app):
+    @app.after_request
+    def compress_response(response):
+        if (
+            response.status_code < 200
+            or response.status_code >= 300
+            or response.direct_passthrough
+            or response.is_streamed
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'Content-Encoding' in response.headers
+        ):
+            return response
+
+        response.vary.add('Accept-Encoding')
+
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if len(data) < app.config['COMPRESS_MIN_SIZE']:
+            return response
+
+        response.set_data(compress(data, encoding, app.config))
+        response.headers['Content-Encoding'] = encoding
+        return response
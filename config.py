@@ -11,14 +11,121 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///patatag.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Réplica somente leitura (opcional) para histórico, alertas e dashboard
+    SQLALCHEMY_READ_DATABASE_URI = os.environ.get('READ_DATABASE_URL')
+    SQLALCHEMY_BINDS = {'replica': SQLALCHEMY_READ_DATABASE_URI} if SQLALCHEMY_READ_DATABASE_URI else {}
+
+    # Após escrever, o cliente lê do banco principal por este tempo (segundos)
+    REPLICA_LAG_TOLERANCE = float(os.environ.get('REPLICA_LAG_TOLERANCE') or 5)
+
+    # GET /api/pets?since=: margem (segundos) antes da versão pedida. updated_at
+    # é a hora do flush, não do commit: uma transação lenta (ou uma réplica
+    # atrasada) pode aparecer depois com uma versão anterior à já devolvida
+    PETS_SYNC_OVERLAP = float(os.environ.get('PETS_SYNC_OVERLAP') or 10)
+
     # Configuração de sessão
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
 
+    # Cache do user_loader (segundos) e validade dos tokens Bearer (segundos)
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 60)
+    API_TOKEN_MAX_AGE = int(os.environ.get('API_TOKEN_MAX_AGE') or 86400)
+
+    # Hash de senhas em pool de processos (0 processos = na thread da requisição)
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or 2)
+    PASSWORD_HASH_MAX_PENDING = 8
+    PASSWORD_HASH_QUEUE_TIMEOUT = 2.0
+
+    # Limite de tentativas de login e de cadastros (janela em segundos). Só
+    # logins errados contam, por conta e por IP. Os contadores ficam na
+    # memória de cada processo: com `gunicorn -w 4` os limites reais são 4x
+    # estes. Atrás de um proxy reverso, configure PROXY_FIX_X_FOR para o IP
+    # ser o do cliente (senão todos compartilham o IP do proxy).
+    LOGIN_THROTTLE_WINDOW = 300
+    LOGIN_MAX_FAILURES_PER_ACCOUNT = 5
+    LOGIN_MAX_FAILURES_PER_IP = 20
+    REGISTER_MAX_PER_IP = 10
+
+    # Número de proxies reversos na frente do app que definem X-Forwarded-For
+    # (0 = nenhum; o IP da conexão é o do cliente)
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR') or 0)
+
+    # Upload de imagens (pasta criada no primeiro upload)
+    UPLOAD_FOLDER = 'static/uploads'
+
+    # Cache no navegador (segundos) dos arquivos com hash (/assets/) e dos uploads
+    ASSETS_MAX_AGE = 365 * 24 * 3600
+
+    # Limite de envios por dispositivo no /api/gps/update (token bucket)
+    INGEST_RATE_PER_SECOND = 0.5      # recarga: 1 fix a cada 2 s, em média
+    INGEST_RATE_BURST = 5             # fixes seguidos permitidos
+    RATE_LIMIT_STORAGE_URL = os.environ.get('RATE_LIMIT_STORAGE_URL')  # ex: redis://localhost:6379/0
+
     # CORS
     CORS_HEADERS = 'Content-Type'
 
-    # Paginação
+    # Compressão das respostas (bytes mínimos, nível do gzip, qualidade do brotli)
+    COMPRESS_MIN_SIZE = 1024
+    COMPRESS_GZIP_LEVEL = 6
+    COMPRESS_BROTLI_QUALITY = 4
+
+    # Paginação do histórico: tamanho padrão da página e máximo de ?limit=
+    # (os formatos compactos, para desenhar trajetos longos, aceitam páginas maiores)
     LOCATIONS_PER_PAGE = 100
+    HISTORY_MAX_LIMIT = 1000
+    HISTORY_COMPACT_MAX_LIMIT = 20000
+
+    # Busca de pets próximos (GET /api/pets/nearby): raio máximo e padrão (metros)
+    NEARBY_MAX_RADIUS = 50000
+    NEARBY_DEFAULT_RADIUS = 1000
+
+    # Agrupamento dos pets no mapa (GET /api/pets/clusters): tamanho aproximado
+    # de cada grupo na tela, zoom a partir do qual vêm os pets individuais e
+    # máximo de pets individuais por resposta (acima disso, continua agrupando)
+    CLUSTER_CELL_PIXELS = 64
+    CLUSTER_PETS_ZOOM = 16
+    CLUSTER_MAX_PETS = 500
+
+    # Arquivo frio do histórico (arquivos colunares por pet/mês). Caminho
+    # relativo é resolvido a partir da pasta instance/ (padrão: instance/archive)
+    ARCHIVE_FOLDER = os.environ.get('ARCHIVE_FOLDER') or 'archive'
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS') or 90)
+
+    # Análise retroativa de cercas (GET /api/pets/<id>/geofence/analysis):
+    # localizações lidas por lote e intervalos fora da cerca listados por cerca
+    GEOFENCE_ANALYSIS_CHUNK_SIZE = 50000
+    GEOFENCE_ANALYSIS_MAX_INTERVALS = 500
+
+    # Última posição de cada pet em memória compartilhada entre os workers (mmap)
+    LATEST_POSITIONS_ENABLED = True
+    LATEST_POSITIONS_FILE = os.environ.get('LATEST_POSITIONS_FILE')  # padrão: instance/latest_positions.bin
+    LATEST_POSITIONS_SLOTS = 65536    # um slot de 104 bytes por pet (pet_id % slots)
+
+    # Remoção de pets em segundo plano: linhas por DELETE e pausa entre lotes (segundos)
+    PURGE_IN_BACKGROUND = True
+    PURGE_CHUNK_SIZE = 5000
+    PURGE_PAUSE = 0.05
 
     # Tempo máximo sem receber dados para considerar o dispositivo offline (em minutos)
     DEVICE_OFFLINE_TIMEOUT = 15
+
+    # Filtro de fixes parados: fixes dentro do raio de erro do último fix aceito
+    # viram um contador de permanência em vez de uma linha nova
+    STATIONARY_FILTER_ENABLED = True
+    STATIONARY_UERE_METERS = 5.0      # erro do receptor por unidade de HDOP
+    STATIONARY_DEFAULT_RADIUS = 10.0  # sem HDOP informado
+    STATIONARY_MIN_RADIUS = 5.0
+    STATIONARY_MAX_RADIUS = 50.0
+    STATIONARY_MAX_SPEED = 2.0        # km/h
+    STATIONARY_MIN_SATELLITES = 4
+
+    # Intervalo de envio sugerido ao ESP32 (next_interval_s, em segundos)
+    REPORT_INTERVAL_DEFAULT = 30
+    REPORT_INTERVAL_STATIONARY = 120
+    REPORT_INTERVAL_LIVE = 5          # dono acompanhando em tempo real
+    REPORT_INTERVAL_ALERT = 10        # fora de uma cerca virtual
+    REPORT_INTERVAL_MIN = 5
+    REPORT_INTERVAL_MAX = 300
+    REPORT_MAX_GAP_METERS = 50        # distância máxima entre fixes em movimento
+    REPORT_PET_SPEED = 3.0            # m/s, para estimar quando alcança a borda da cerca
+    REPORT_LOW_BATTERY = 20           # abaixo disso, dobra o intervalo
+    REPORT_WATCH_TTL = 60             # validade da marcação de stream aberto
@@ -0,0 +1,22 @@
+"""
+Datas como microssegundos desde 1970 (UTC)
+
+Formato usado no banco (models.EpochTimestamp), no arquivo frio, na tabela
+de últimas posições e nos formatos compactos do histórico.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch_us(dt):
+    """Converte datetime (ingênuo em UTC ou com fuso) para microssegundos desde a época"""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return (dt - EPOCH) // timedelta(microseconds=1)
+
+
+def from_epoch_us(value):
+    """Microssegundos desde a época (int ou inteiro do NumPy) para datetime ingênuo em UTC"""
+    return EPOCH + timedelta(microseconds=int(value))
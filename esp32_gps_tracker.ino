@@ -31,7 +31,10 @@ const char* API_URL = "http://SEU-IP:5000/api/gps/update";
 const char* API_KEY = "SEU_PET_API";  // Você recebe isso ao criar o pet no sistema
 
 // Configurações de envio
-const unsigned long SEND_INTERVAL = 30000;  // Enviar a cada 30 segundos
+// O servidor responde com next_interval_s (intervalo adaptativo); estes são os limites
+const unsigned long SEND_INTERVAL = 30000;      // Intervalo inicial: 30 segundos
+const unsigned long MIN_SEND_INTERVAL = 5000;   // Nunca envia mais rápido que 5 s
+const unsigned long MAX_SEND_INTERVAL = 600000; // Nunca fica mais de 10 min sem enviar
 const unsigned long GPS_TIMEOUT = 60000;    // Timeout para obter fix GPS
 
 // ==========================================
@@ -42,6 +45,7 @@ TinyGPSPlus gps;
 HardwareSerial GPS_Serial(2);  // UART2 do ESP32
 
 unsigned long lastSendTime = 0;
+unsigned long sendInterval = SEND_INTERVAL;  // Ajustado pela resposta do servidor
 unsigned long lastGPSCheck = 0;
 bool wifiConnected = false;
 
@@ -54,7 +58,7 @@ void setup() {
   GPS_Serial.begin(9600, SERIAL_8N1, 16, 17);  // RX=16, TX=17
 
   Serial.println("\n=================================");
-  Serial.println("PATATAG GPS Tracker v1.0");
+  Serial.println("PATATAG GPS Tracker v1.1");
   Serial.println("ESP32 + NEO-6M");
   Serial.println("=================================\n");
 
@@ -86,7 +90,7 @@ void loop() {
 
   // Enviar dados se o intervalo passou
   unsigned long currentTime = millis();
-  if (currentTime - lastSendTime >= SEND_INTERVAL) {
+  if (currentTime - lastSendTime >= sendInterval) {
     lastSendTime = currentTime;
 
     if (gps.location.isValid()) {
@@ -189,7 +193,12 @@ void sendGPSData() {
 
     if (httpResponseCode == 200) {
       Serial.println("✓ Localização enviada com sucesso!");
+      updateSendInterval(response);
       displayCurrentLocation();
+    } else if (httpResponseCode == 429) {
+      // Enviando rápido demais: o servidor diz quanto esperar
+      Serial.println("✗ Limite de envios atingido");
+      updateSendInterval(response);
     } else {
       Serial.println("✗ Erro ao enviar localização");
     }
@@ -201,6 +210,24 @@ void sendGPSData() {
   http.end();
 }
 
+void updateSendInterval(const String& response) {
+  // O servidor sugere o próximo intervalo: menor com o pet em movimento,
+  // perto/fora da cerca ou com alguém olhando o mapa; maior com ele parado
+  StaticJsonDocument<256> doc;
+  DeserializationError error = deserializeJson(doc, response);
+
+  if (error || !doc.containsKey("next_interval_s")) {
+    return;  // Mantém o intervalo atual
+  }
+
+  unsigned long seconds = doc["next_interval_s"];
+  sendInterval = constrain(seconds * 1000UL, MIN_SEND_INTERVAL, MAX_SEND_INTERVAL);
+
+  Serial.print("Próximo envio em: ");
+  Serial.print(sendInterval / 1000);
+  Serial.println(" s");
+}
+
 void displayCurrentLocation() {
   Serial.println("\n--- Localização Atual ---");
   Serial.print("Lat: ");
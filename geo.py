@@ -0,0 +1,151 @@
+"""
+Funções geográficas usadas na ingestão e nas consultas
+"""
+
+from datetime import timedelta
+from math import radians, cos, sin, asin, sqrt, floor
+
+from flask import current_app
+
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """Calcula distância entre duas coordenadas em metros"""
+    R = 6371000  # Raio da Terra em metros
+    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+    c = 2 * asin(sqrt(a))
+    return R * c
+
+
+# ============================================
+# GEOHASH (ÍNDICE ESPACIAL)
+# ============================================
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9      # células de ~5 m x 5 m
+GEOHASH_MAX_CELLS = 16     # células consultadas por busca
+METERS_PER_DEGREE = 111320
+
+
+def geohash_encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Geohash da coordenada: pontos próximos compartilham o mesmo prefixo"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+
+    while len(chars) < precision:
+        target, coord = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (target[0] + target[1]) / 2
+        value <<= 1
+        if coord >= middle:
+            value |= 1
+            target[0] = middle
+        else:
+            target[1] = middle
+        even = not even
+
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = 0
+            value = 0
+
+    return ''.join(chars)
+
+
+def geohash_cell_size(precision):
+    """(altura, largura) em graus de uma célula com esta precisão"""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def bbox_around(latitude, longitude, radius_meters):
+    """Retângulo (min_lat, min_lng, max_lat, max_lng) que contém o círculo"""
+    dlat = radius_meters / METERS_PER_DEGREE
+    lat_cos = cos(radians(min(abs(latitude) + dlat, 89.9)))
+    dlng = min(radius_meters / (METERS_PER_DEGREE * lat_cos), 180.0)
+    return latitude - dlat, longitude - dlng, latitude + dlat, longitude + dlng
+
+
+def geohash_cover(min_lat, min_lng, max_lat, max_lng, max_cells=GEOHASH_MAX_CELLS):
+    """
+    Prefixos geohash que cobrem o retângulo: a maior precisão que precise de
+    no máximo `max_cells` células. Longitudes fora de [-180, 180] dão a volta.
+    """
+    min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = geohash_cell_size(precision)
+        lat_cells = round(180 / height)
+        lng_cells = round(360 / width)
+
+        rows = range(floor((min_lat + 90) / height), min(floor((max_lat + 90) / height), lat_cells - 1) + 1)
+        first_col = floor((min_lng + 180) / width)
+        cols = min(floor((max_lng + 180) / width) - first_col + 1, lng_cells)
+
+        if len(rows) * cols <= max_cells or precision == 1:
+            cells = set()
+            for row in rows:
+                for col in range(first_col, first_col + cols):
+                    # Centro da célula, com a longitude normalizada
+                    lat = -90 + (row + 0.5) * height
+                    lng = -180 + ((col % lng_cells) + 0.5) * width
+                    cells.add(geohash_encode(lat, lng, precision))
+            return sorted(cells)
+
+
+def cluster_precision(zoom, cell_pixels):
+    """
+    Precisão do geohash cujas células têm cerca de `cell_pixels` de largura
+    no mapa (tiles de 256 px, como no Leaflet) neste nível de zoom
+    """
+    target = cell_pixels * 360.0 / (256 * 2 ** zoom)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        if geohash_cell_size(precision)[1] >= target:
+            return precision
+    return 1
+
+
+def fix_error_radius(hdop, satellites):
+    """Raio de erro estimado (metros) de um fix, a partir do HDOP e dos satélites"""
+    config = current_app.config
+    if hdop is None:
+        radius = config['STATIONARY_DEFAULT_RADIUS']
+    else:
+        radius = hdop * config['STATIONARY_UERE_METERS']
+
+    # Poucos satélites: a posição é menos confiável que o HDOP sugere
+    if satellites is not None and satellites < config['STATIONARY_MIN_SATELLITES']:
+        radius *= 2
+
+    return radius
+
+
+def is_stationary(anchor, latitude, longitude, speed, hdop, satellites, now):
+    """
+    Verifica se o novo fix é só ruído do GPS em torno do último fix aceito
+    (`anchor`), ou seja, se o pet continua parado no mesmo lugar
+    """
+    config = current_app.config
+    if anchor is None or not config['STATIONARY_FILTER_ENABLED']:
+        return False
+
+    if speed is not None and speed > config['STATIONARY_MAX_SPEED']:
+        return False
+
+    # Depois de um intervalo longo sem dados, começa um registro novo
+    last_seen = anchor.dwell_until or anchor.timestamp
+    if now - last_seen > timedelta(minutes=config['DEVICE_OFFLINE_TIMEOUT']):
+        return False
+
+    threshold = fix_error_radius(anchor.hdop, anchor.satellites) + fix_error_radius(hdop, satellites)
+    threshold = min(max(threshold, config['STATIONARY_MIN_RADIUS']), config['STATIONARY_MAX_RADIUS'])
+
+    distance = haversine_distance(anchor.latitude, anchor.longitude, latitude, longitude)
+    return distance <= threshold
@@ -0,0 +1,127 @@
+"""
+Análise retroativa de cercas virtuais sobre o histórico guardado
+
+check_geofence_violations só avalia cada fix novo. Aqui uma ou mais cercas
+(salvas ou ainda em rascunho) são avaliadas contra todo o histórico do pet:
+arquivo frio e tabela, lidos em lotes de colunas NumPy
+(archive.iter_track_columns). A distância ao centro é calculada para o lote
+inteiro de uma vez, e só as trocas dentro/fora passam por Python.
+
+Um intervalo fora começa no primeiro fix fora da cerca e termina no
+primeiro fix de volta dentro. Se o histórico termina com o pet fora, o
+intervalo fica aberto (`enter` nulo) e conta até o último fix.
+"""
+
+import numpy as np
+from flask import current_app
+
+import archive
+from epoch import from_epoch_us
+
+EARTH_RADIUS = 6371000  # metros, como em geo.haversine_distance
+
+
+def distances_to(center_lat, center_lng, latitudes, longitudes):
+    """Distâncias (metros) de um ponto a vários (haversine vetorizado)"""
+    lat1, lng1 = np.radians(center_lat), np.radians(center_lng)
+    lat2, lng2 = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))
+
+
+class ZoneTrack:
+    """Estado de uma cerca enquanto os lotes do histórico passam"""
+
+    def __init__(self, zone, max_intervals):
+        self.zone = zone
+        self.max_intervals = max_intervals
+        self.outside = None        # estado no último fix visto (None = nenhum fix ainda)
+        self.exit_us = None        # início do intervalo fora em andamento
+        self.first_us = None
+        self.last_us = None
+        self.fixes = 0
+        self.fixes_outside = 0
+        self.exits = 0
+        self.outside_us = 0
+        self.intervals = []
+
+    def _close(self, enter_us):
+        duration = enter_us - self.exit_us
+        self.outside_us += duration
+        if len(self.intervals) < self.max_intervals:
+            self.intervals.append({
+                'exit': from_epoch_us(self.exit_us),
+                'enter': from_epoch_us(enter_us),
+                'duration_s': duration / 1e6
+            })
+        self.exit_us = None
+
+    def feed(self, columns):
+        timestamps = columns['timestamp']
+        outside = distances_to(
+            self.zone.center_lat, self.zone.center_lng, columns['latitude'], columns['longitude']
+        ) > self.zone.radius_meters
+
+        if self.outside is None:
+            self.first_us = int(timestamps[0])
+            previous = False  # começa como dentro: o primeiro fix fora já abre um intervalo
+        else:
+            previous = self.outside
+
+        changes = np.flatnonzero(outside != np.concatenate(([previous], outside[:-1])))
+        for i in changes.tolist():
+            if outside[i]:
+                self.exits += 1
+                self.exit_us = int(timestamps[i])
+            else:
+                self._close(int(timestamps[i]))
+
+        self.outside = bool(outside[-1])
+        self.last_us = max(int(timestamps[-1]), int(columns['dwell_until'][-1]))
+        self.fixes += len(outside)
+        self.fixes_outside += int(outside.sum())
+
+    def result(self):
+        outside_us = self.outside_us
+        intervals = list(self.intervals)
+        if self.exit_us is not None:
+            # Ainda fora no fim do histórico
+            open_us = self.last_us - self.exit_us
+            outside_us += open_us
+            if len(intervals) < self.max_intervals:
+                intervals.append({'exit': from_epoch_us(self.exit_us), 'enter': None, 'duration_s': open_us / 1e6})
+
+        observed_us = self.last_us - self.first_us if self.fixes else 0
+        return {
+            'zone': {
+                'id': self.zone.id,
+                'name': self.zone.name,
+                'center_lat': self.zone.center_lat,
+                'center_lng': self.zone.center_lng,
+                'radius_meters': self.zone.radius_meters
+            },
+            'fixes': self.fixes,
+            'fixes_outside': self.fixes_outside,
+            'exits': self.exits,
+            'time_outside_s': outside_us / 1e6,
+            'time_observed_s': observed_us / 1e6,
+            'outside_ratio': outside_us / observed_us if observed_us else 0.0,
+            'first_fix': from_epoch_us(self.first_us) if self.fixes else None,
+            'last_fix': from_epoch_us(self.last_us) if self.fixes else None,
+            'intervals': intervals,
+            'intervals_truncated': self.exits > len(intervals)
+        }
+
+
+def analyze_zones(pet_id, zones, start=None, end=None):
+    """Avalia as cercas contra o histórico do pet; um resultado por cerca"""
+    config = current_app.config
+    tracks = [ZoneTrack(zone, config['GEOFENCE_ANALYSIS_MAX_INTERVALS']) for zone in zones]
+
+    for columns in archive.iter_track_columns(pet_id, start, end, config['GEOFENCE_ANALYSIS_CHUNK_SIZE']):
+        if not len(columns['timestamp']):
+            continue
+        for track in tracks:
+            track.feed(columns)
+
+    return [track.result() for track in tracks]
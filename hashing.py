@@ -0,0 +1,86 @@
+"""
+Hash de senhas fora da thread da requisição
+
+O scrypt do Werkzeug é propositalmente pesado para a CPU. Rodar isso dentro
+da thread da requisição segura o GIL e atrasa o resto do servidor (inclusive
+a ingestão do ESP32). Aqui o hash roda num pool de processos limitado:
+
+- PASSWORD_HASH_WORKERS: processos do pool (0 = roda na própria thread)
+- PASSWORD_HASH_MAX_PENDING: máximo de hashes em andamento + na fila
+- PASSWORD_HASH_QUEUE_TIMEOUT: segundos esperando vaga/resultado antes de
+  desistir com HashingBusy
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+from werkzeug import security
+
+_settings = {
+    'workers': 0,
+    'max_pending': 8,
+    'queue_timeout': 2.0,
+}
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(_settings['max_pending'])
+
+
+class HashingBusy(Exception):
+    """O pool de hash está saturado; o cliente deve tentar de novo mais tarde"""
+
+    def __init__(self, retry_after):
+        super().__init__('Servidor ocupado processando senhas')
+        self.retry_after = retry_after
+
+
+def init_app(app):
+    """Lê a configuração do pool a partir do app Flask"""
+    global _slots
+    _settings['workers'] = app.config['PASSWORD_HASH_WORKERS']
+    _settings['max_pending'] = app.config['PASSWORD_HASH_MAX_PENDING']
+    _settings['queue_timeout'] = app.config['PASSWORD_HASH_QUEUE_TIMEOUT']
+    _slots = threading.BoundedSemaphore(_settings['max_pending'])
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # forkserver evita herdar threads/conexões do servidor (spawn no Windows)
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                _pool = ProcessPoolExecutor(max_workers=_settings['workers'], mp_context=context)
+    return _pool
+
+
+def _run(func, *args):
+    if not _settings['workers']:
+        return func(*args)
+
+    timeout = _settings['queue_timeout']
+    if not _slots.acquire(timeout=timeout):
+        raise HashingBusy(retry_after=max(1, int(timeout)))
+
+    try:
+        future = _get_pool().submit(func, *args)
+    except Exception:
+        _slots.release()
+        raise
+
+    # A vaga só é liberada quando o processo termina, mesmo se a espera expirar
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        raise HashingBusy(retry_after=max(1, int(timeout)))
+
+
+def generate_password_hash(password):
+    return _run(security.generate_password_hash, password)
+
+
+def check_password_hash(pwhash, password):
+    return _run(security.check_password_hash, pwhash, password)
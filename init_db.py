@@ -3,8 +3,12 @@ Script para inicializar o banco de dados
 Execute este script antes de iniciar o servidor pela primeira vez
 """
 
-from app import app, db
-from models import User, Pet, Location, GeofenceZone, Alert
+from app import create_app
+from models import db, User, Pet, Location, GeofenceZone, Alert
+import positions
+
+# Só o banco: este script não precisa das rotas
+app = create_app(with_routes=False)
 
 def init_database():
     """Criar todas as tabelas do banco de dados"""
@@ -19,6 +23,10 @@ def init_database():
         db.create_all()
         print("  [OK] Tabelas criadas com sucesso")
 
+        # Últimas posições em memória compartilhada eram do banco antigo
+        positions.clear(app)
+        print("  [OK] Ultimas posicoes em cache removidas")
+
         # Verificar tabelas criadas
         inspector = db.inspect(db.engine)
         tables = inspector.get_table_names()
@@ -0,0 +1,64 @@
+"""
+Provider JSON rápido para o Flask
+
+Usa o orjson quando estiver instalado (cai para o json da biblioteca padrão
+se não estiver). Em ambos os casos datas/horas viram ISO 8601, então os
+modelos podem devolver datetime direto em to_dict().
+"""
+
+import json
+from datetime import date, datetime, time
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # opcional
+    orjson = None
+
+
+def _default(o):
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON com orjson (se disponível) e datas em ISO 8601"""
+
+    default = staticmethod(_default)
+    sort_keys = False
+
+    def _orjson_options(self, indent=False):
+        options = orjson.OPT_NON_STR_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def dumps(self, obj, **kwargs):
+        # Argumentos específicos do json (cls, ensure_ascii...) exigem a biblioteca padrão
+        if orjson is not None and set(kwargs) <= {'indent', 'separators'}:
+            options = self._orjson_options(indent=bool(kwargs.get('indent')))
+            return orjson.dumps(obj, default=self.default, option=options).decode()
+
+        kwargs.setdefault('default', self.default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        # Gera bytes direto, sem passar por str
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self._orjson_options(indent))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
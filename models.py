@@ -1,9 +1,49 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from hashing import generate_password_hash, check_password_hash
+from routing import RoutingSession
+import positions
+from epoch import to_epoch_us, from_epoch_us
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+class FixedPoint(db.TypeDecorator):
+    """Número real guardado como inteiro escalado (valor * scale), limitado à faixa da coluna"""
+    impl = db.Integer
+    cache_ok = True
+    limit = 2 ** 31 - 1
+
+    def __init__(self, scale):
+        super().__init__()
+        self.scale = scale
+
+    def process_bind_param(self, value, dialect):
+        if value is None or value != value:  # NaN também vira nulo
+            return None
+        return max(-self.limit, min(self.limit, round(float(value) * self.scale)))
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else value / self.scale
+
+
+class SmallFixedPoint(FixedPoint):
+    impl = db.SmallInteger
+    cache_ok = True
+    limit = 2 ** 15 - 1
+
+
+class EpochTimestamp(db.TypeDecorator):
+    """datetime UTC guardado como inteiro: microssegundos desde 1970"""
+    impl = db.BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else to_epoch_us(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else from_epoch_us(value)
 
-db = SQLAlchemy()
 
 class User(UserMixin, db.Model):
     """Modelo de usuário"""
@@ -31,7 +71,7 @@ class User(UserMixin, db.Model):
             'name': self.name,
             'email': self.email,
             'profile_image': self.profile_image,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at
         }
 
 class Pet(db.Model):
@@ -52,9 +92,79 @@ class Pet(db.Model):
     battery_level = db.Column(db.Integer, default=100)
     last_seen = db.Column(db.DateTime)
 
+    # Versão para sincronização incremental (GET /api/pets?since=)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    # Última posição, com geohash para a busca de pets próximos (GET /api/pets/nearby)
+    last_latitude = db.Column(db.Float)
+    last_longitude = db.Column(db.Float)
+    geohash = db.Column(db.String(12))
+
+    # Até quando há alguém acompanhando o pet em tempo real (stream SSE aberto)
+    watched_until = db.Column(db.DateTime)
+
+    # Remoção em duas etapas: o pet some da API na hora e os dados são
+    # apagados depois, em lotes (purge.py)
+    deleted_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_pets_user_geohash', 'user_id', 'geohash'),
+    )
+
     locations = db.relationship('Location', backref='pet', lazy=True, cascade='all, delete-orphan')
+    # Cercas do pet (carregadas de uma vez para vários pets em GET /api/bootstrap)
+    zones = db.relationship('GeofenceZone', lazy=True, order_by='GeofenceZone.id')
+
+    @classmethod
+    def active(cls):
+        """Query dos pets não deletados"""
+        return cls.query.filter(cls.deleted_at.is_(None))
+
+    def last_location_dict(self):
+        """Última localização (memória compartilhada; consulta o banco se não estiver lá)"""
+        cached = positions.latest(self.id, self.user_id, self.created_at)
+        if cached:
+            return cached['location']
+
+        last_location = Location.query.filter_by(pet_id=self.id).order_by(Location.timestamp.desc()).first()
+        if last_location is None:
+            return None
+        positions.remember(self, last_location, only_if_newer=True)
+        return last_location.to_dict()
 
-    def to_dict(self, include_last_location=False):
+    @staticmethod
+    def last_location_dicts(pets):
+        """
+        Última localização de vários pets ({pet_id: dict}): memória compartilhada
+        e, para os que não estiverem lá, uma consulta só para todos
+        """
+        result = {}
+        missing = {}
+        for pet in pets:
+            cached = positions.latest(pet.id, pet.user_id, pet.created_at)
+            if cached:
+                result[pet.id] = cached['location']
+            else:
+                missing[pet.id] = pet
+
+        if missing:
+            latest = db.session.query(
+                Location.pet_id, db.func.max(Location.timestamp).label('timestamp')
+            ).filter(Location.pet_id.in_(missing)).group_by(Location.pet_id).subquery()
+            locations = Location.query.join(latest, db.and_(
+                Location.pet_id == latest.c.pet_id, Location.timestamp == latest.c.timestamp
+            )).all()
+            for location in locations:
+                positions.remember(missing[location.pet_id], location, only_if_newer=True)
+                result[location.pet_id] = location.to_dict()
+
+        return result
+
+    def to_dict(self, include_last_location=False, fields=None, last_locations=None):
+        """
+        Serializa o pet; `fields` limita as chaves retornadas (o id sempre vai).
+        `last_locations` (de last_location_dicts) evita uma consulta por pet.
+        """
         data = {
             'id': self.id,
             'name': self.name,
@@ -64,28 +174,69 @@ class Pet(db.Model):
             'device_id': self.device_id,
             'is_online': self.is_online,
             'battery_level': self.battery_level,
-            'last_seen': self.last_seen.isoformat() if self.last_seen else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'last_seen': self.last_seen,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
 
-        if include_last_location:
-            last_location = Location.query.filter_by(pet_id=self.id).order_by(Location.timestamp.desc()).first()
-            data['last_location'] = last_location.to_dict() if last_location else None
+        if include_last_location and (fields is None or 'last_location' in fields):
+            if last_locations is not None:
+                data['last_location'] = last_locations.get(self.id)
+            else:
+                data['last_location'] = self.last_location_dict()
+
+        if fields is not None:
+            data = {key: value for key, value in data.items() if key == 'id' or key in fields}
 
         return data
 
+
+class PetTombstone(db.Model):
+    """Registro de pets deletados, para a sincronização incremental e o progresso da remoção"""
+    __tablename__ = 'pet_tombstones'
+
+    id = db.Column(db.Integer, primary_key=True)
+    pet_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    # Linhas já apagadas e fim da remoção em segundo plano (None = em andamento)
+    purged_rows = db.Column(db.Integer, default=0)
+    purged_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'pet_id': self.pet_id,
+            'deleted_at': self.deleted_at,
+            'purged_rows': self.purged_rows or 0,
+            'purged_at': self.purged_at,
+            'finished': self.purged_at is not None
+        }
+
 # ... (O restante dos modelos Location, GeofenceZone e Alert continua igual) ...
 class Location(db.Model):
     __tablename__ = 'locations'
     id = db.Column(db.Integer, primary_key=True)
     pet_id = db.Column(db.Integer, db.ForeignKey('pets.id'), nullable=False)
-    latitude = db.Column(db.Float, nullable=False)
-    longitude = db.Column(db.Float, nullable=False)
-    altitude = db.Column(db.Float)
-    speed = db.Column(db.Float)
-    satellites = db.Column(db.Integer)
-    hdop = db.Column(db.Float)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # Formato compacto, na precisão do GPS: coordenadas em 1e-7 grau (~1 cm),
+    # altitude em metros, velocidade (km/h) e hdop com 2 casas, horários em
+    # microssegundos. Os atributos continuam float/datetime (schema.py migra bancos antigos).
+    latitude = db.Column('latitude_e7', FixedPoint(10 ** 7), nullable=False)
+    longitude = db.Column('longitude_e7', FixedPoint(10 ** 7), nullable=False)
+    altitude = db.Column('altitude_m', SmallFixedPoint(1))
+    speed = db.Column('speed_e2', SmallFixedPoint(100))
+    satellites = db.Column(db.SmallInteger)
+    hdop = db.Column('hdop_e2', SmallFixedPoint(100))
+    timestamp = db.Column('timestamp_us', EpochTimestamp, default=datetime.utcnow, nullable=False)
+
+    # Fixes parados agrupados neste registro: quantidade e horário do último
+    dwell_count = db.Column(db.Integer, default=1)
+    dwell_until = db.Column('dwell_until_us', EpochTimestamp)
+
+    __table_args__ = (
+        db.Index('ix_locations_pet_timestamp', 'pet_id', 'timestamp_us'),
+    )
 
     def to_dict(self):
         return {
@@ -97,7 +248,9 @@ class Location(db.Model):
             'speed': self.speed,
             'satellites': self.satellites,
             'hdop': self.hdop,
-            'timestamp': self.timestamp.isoformat() if self.timestamp else None
+            'timestamp': self.timestamp,
+            'dwell_count': self.dwell_count or 1,
+            'dwell_until': self.dwell_until
         }
 
 class GeofenceZone(db.Model):
@@ -120,7 +273,7 @@ class GeofenceZone(db.Model):
             'center_lng': self.center_lng,
             'radius_meters': self.radius_meters,
             'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at
         }
 
 class Alert(db.Model):
@@ -139,5 +292,5 @@ class Alert(db.Model):
             'alert_type': self.alert_type,
             'message': self.message,
             'is_read': self.is_read,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at
         }
\ No newline at end of file
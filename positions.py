@@ -0,0 +1,233 @@
+"""
+Tabela da última posição de cada pet em memória compartilhada (mmap)
+
+Um arquivo com um slot de tamanho fixo por pet (slot = pet_id % slots),
+mapeado em memória por todos os workers. O update_gps grava o slot depois do
+commit. get_pet_location, GET /api/pets e o stream SSE leem dele em vez de
+buscar a última localização no banco. Quando o slot está vazio ou pertence
+a outro pet, a leitura vai ao banco e aquece o slot.
+
+O arquivo não sabe de qual banco veio. Por isso cada slot guarda o dono e
+o created_at do pet, e quem lê confere com a linha do pet já carregada
+(ativa). Um slot de um banco recriado, de um id reaproveitado ou de um pet
+deletado (um update_gps em andamento pode gravar depois do forget) não
+confere e não é servido. `flask init-db` e init_db.py também esvaziam o
+arquivo (clear).
+
+Leitura sem trava (seqlock): o escritor deixa o contador de sequência ímpar
+enquanto grava e par quando termina. O leitor repete se pegar um valor
+ímpar ou se o contador mudar durante a leitura (leitura "rasgada").
+Escritores de processos diferentes se excluem com uma trava de registro
+(fcntl) no próprio slot.
+"""
+
+import math
+import mmap
+import os
+import struct
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+
+from flask import current_app
+
+from epoch import to_epoch_us, from_epoch_us
+
+try:
+    import fcntl
+except ImportError:  # Windows: só há um processo no servidor de desenvolvimento
+    fcntl = None
+
+MAGIC = b'PTLP'
+VERSION = 2
+HEADER = struct.Struct('<4sII')        # magic, versão, slots
+SEQ = struct.Struct('<Q')
+# Campos do slot, na ordem do RECORD. created_at, timestamp e dwell_until em
+# µs (-1 = nulo); satellites e battery -1 = nulo.
+Record = namedtuple('Record', (
+    'pet_id user_id created_at location_id latitude longitude altitude speed hdop '
+    'timestamp dwell_until dwell_count satellites battery'
+))
+RECORD = struct.Struct('<qqqqdddddqqihh')
+SLOT_SIZE = (SEQ.size + RECORD.size + 7) // 8 * 8
+READ_RETRIES = 8
+
+def _optional_us(dt):
+    return -1 if dt is None else to_epoch_us(dt)
+
+
+def _float(value):
+    return math.nan if value is None else float(value)
+
+
+def _optional(value):
+    return None if math.isnan(value) else value
+
+
+class LatestPositions:
+    """Arquivo de slots mapeado em memória"""
+
+    def __init__(self, path, slots):
+        self.slots = slots
+        self._lock = threading.Lock()
+        size = HEADER.size + slots * SLOT_SIZE
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o600)
+        header = HEADER.pack(MAGIC, VERSION, slots)
+        with self._file_lock(0, HEADER.size):
+            # Arquivo novo ou com outro formato: recomeça vazio
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            if os.fstat(self._fd).st_size != size or os.read(self._fd, HEADER.size) != header:
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                os.write(self._fd, header)
+        self._mm = mmap.mmap(self._fd, size)
+
+    def _offset(self, pet_id):
+        return HEADER.size + (pet_id % self.slots) * SLOT_SIZE
+
+    @contextmanager
+    def _file_lock(self, offset, length):
+        """Trava entre threads e, com fcntl, entre processos (só o trecho do slot)"""
+        with self._lock:
+            if fcntl is not None:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX, length, offset)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.lockf(self._fd, fcntl.LOCK_UN, length, offset)
+
+    def read(self, pet_id):
+        """Record do pet, ou None se o slot estiver vazio/for de outro pet"""
+        offset = self._offset(pet_id)
+        for _ in range(READ_RETRIES):
+            (seq,) = SEQ.unpack_from(self._mm, offset)
+            if seq & 1:
+                continue
+            record = Record._make(RECORD.unpack_from(self._mm, offset + SEQ.size))
+            if SEQ.unpack_from(self._mm, offset)[0] == seq:
+                break
+        else:
+            return None  # escrita em andamento: o chamador vai ao banco
+
+        if seq == 0 or record.pet_id != pet_id:
+            return None
+        return record
+
+    def write(self, pet_id, record, only_if_newer=False):
+        """Grava o slot (record=None limpa). only_if_newer não sobrescreve um fix mais novo."""
+        offset = self._offset(pet_id)
+        with self._file_lock(offset, SLOT_SIZE):
+            (seq,) = SEQ.unpack_from(self._mm, offset)
+            if only_if_newer and seq:
+                current = Record._make(RECORD.unpack_from(self._mm, offset + SEQ.size))
+                if current.pet_id == pet_id and current.location_id >= record.location_id:
+                    return
+
+            SEQ.pack_into(self._mm, offset, seq + 1)
+            if record is None:
+                self._mm[offset + SEQ.size:offset + SEQ.size + RECORD.size] = bytes(RECORD.size)
+            else:
+                RECORD.pack_into(self._mm, offset + SEQ.size, *record)
+            SEQ.pack_into(self._mm, offset, seq + 2)
+
+    def clear(self):
+        """Esvazia todos os slots (com os leitores e escritores rodando)"""
+        empty = bytes(RECORD.size)
+        with self._file_lock(HEADER.size, self.slots * SLOT_SIZE):
+            for slot in range(self.slots):
+                offset = HEADER.size + slot * SLOT_SIZE
+                (seq,) = SEQ.unpack_from(self._mm, offset)
+                if seq:
+                    SEQ.pack_into(self._mm, offset, seq + 1)
+                    self._mm[offset + SEQ.size:offset + SEQ.size + RECORD.size] = empty
+                    SEQ.pack_into(self._mm, offset, seq + 2)
+
+
+# ============================================
+# INTEGRAÇÃO COM O APP
+# ============================================
+
+def _open(app):
+    path = app.config['LATEST_POSITIONS_FILE'] or os.path.join(app.instance_path, 'latest_positions.bin')
+    return LatestPositions(path, app.config['LATEST_POSITIONS_SLOTS'])
+
+
+def init_app(app):
+    if not app.config['LATEST_POSITIONS_ENABLED']:
+        return
+    app.extensions['latest_positions'] = _open(app)
+
+
+def clear(app):
+    """Esvazia a tabela: o banco foi recriado e os slots são de outro banco"""
+    if not app.config['LATEST_POSITIONS_ENABLED']:
+        return
+    table = app.extensions.get('latest_positions') or _open(app)
+    table.clear()
+
+
+def _table():
+    return current_app.extensions.get('latest_positions')
+
+
+def remember(pet, location, only_if_newer=False):
+    """Grava a última localização do pet (chamar depois do commit)"""
+    table = _table()
+    if table is None:
+        return
+    record = Record(
+        pet_id=pet.id,
+        user_id=pet.user_id,
+        created_at=_optional_us(pet.created_at),
+        location_id=location.id,
+        latitude=location.latitude,
+        longitude=location.longitude,
+        altitude=_float(location.altitude),
+        speed=_float(location.speed),
+        hdop=_float(location.hdop),
+        timestamp=to_epoch_us(location.timestamp),
+        dwell_until=_optional_us(location.dwell_until),
+        dwell_count=location.dwell_count or 1,
+        satellites=-1 if location.satellites is None else location.satellites,
+        battery=-1 if pet.battery_level is None else pet.battery_level,
+    )
+    table.write(pet.id, record, only_if_newer=only_if_newer)
+
+
+def forget(pet_id):
+    table = _table()
+    if table is not None:
+        table.write(pet_id, None)
+
+
+def latest(pet_id, user_id, created_at):
+    """
+    {'battery_level', 'location'} da memória compartilhada, com 'location' no
+    formato de Location.to_dict(), ou None (vá ao banco). user_id e
+    created_at vêm da linha do pet (ativo) e precisam bater com o slot.
+    """
+    table = _table()
+    record = table.read(pet_id) if table is not None else None
+    if record is None or record.user_id != user_id or record.created_at != _optional_us(created_at):
+        return None
+
+    return {
+        'battery_level': None if record.battery < 0 else record.battery,
+        'location': {
+            'id': record.location_id,
+            'pet_id': record.pet_id,
+            'latitude': record.latitude,
+            'longitude': record.longitude,
+            'altitude': _optional(record.altitude),
+            'speed': _optional(record.speed),
+            'satellites': None if record.satellites < 0 else record.satellites,
+            'hdop': _optional(record.hdop),
+            'timestamp': from_epoch_us(record.timestamp),
+            'dwell_count': record.dwell_count,
+            'dwell_until': None if record.dwell_until < 0 else from_epoch_us(record.dwell_until)
+        }
+    }
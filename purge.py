@@ -0,0 +1,111 @@
+"""
+Remoção de pets em segundo plano
+
+DELETE /api/pets/<id> só marca o pet como deletado (some da API na hora) e
+registra um PetTombstone. A limpeza acontece aqui, numa thread: localizações,
+alertas e cercas são apagados com DELETEs em lotes de PURGE_CHUNK_SIZE
+linhas, com commit a cada lote. Nada é carregado na sessão e o banco nunca
+fica travado por muito tempo. O progresso fica no tombstone (purged_rows,
+purged_at).
+
+Se o servidor reiniciar no meio, `flask purge-deleted-pets` termina o que
+ficou pendente.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import delete, select, update
+
+from models import db, Pet, Location, Alert, GeofenceZone, PetTombstone
+import positions
+
+logger = logging.getLogger(__name__)
+
+# Tabelas apagadas antes do pet, na ordem
+CHILD_MODELS = (Location, Alert, GeofenceZone)
+
+_running = set()
+_running_lock = threading.Lock()
+
+
+def _delete_chunk(model, pet_id, chunk_size):
+    """Apaga até chunk_size linhas do pet; retorna quantas foram apagadas"""
+    ids = select(model.id).where(model.pet_id == pet_id).limit(chunk_size).scalar_subquery()
+    result = db.session.execute(
+        delete(model).where(model.id.in_(ids)),
+        execution_options={'synchronize_session': False}
+    )
+    return result.rowcount
+
+
+def _tombstone(pet_id):
+    """Update do tombstone da remoção em andamento"""
+    return update(PetTombstone).where(PetTombstone.pet_id == pet_id, PetTombstone.purged_at.is_(None))
+
+
+def purge_pet(pet_id):
+    """Apaga os dados do pet em lotes e depois o próprio pet. Retorna as linhas apagadas."""
+    config = current_app.config
+    total = 0
+
+    for model in CHILD_MODELS:
+        while True:
+            deleted = _delete_chunk(model, pet_id, config['PURGE_CHUNK_SIZE'])
+            if deleted:
+                total += deleted
+                db.session.execute(_tombstone(pet_id).values(purged_rows=PetTombstone.purged_rows + deleted))
+            db.session.commit()
+
+            if deleted < config['PURGE_CHUNK_SIZE']:
+                break
+            # Pausa entre lotes para a ingestão do ESP32 não esperar
+            time.sleep(config['PURGE_PAUSE'])
+
+    db.session.execute(delete(Pet).where(Pet.id == pet_id))
+    db.session.execute(_tombstone(pet_id).values(purged_at=datetime.utcnow()))
+    db.session.commit()
+    # De novo: um update_gps em andamento pode ter regravado o slot depois do delete_pet
+    positions.forget(pet_id)
+
+    # O arquivo frio (numpy) só é carregado quando necessário
+    import archive
+    archive.delete_pet_archive(pet_id)
+
+    logger.info('Pet %s removido: %s linhas apagadas', pet_id, total)
+    return total
+
+
+def _run(app, pet_id):
+    with app.app_context():
+        try:
+            purge_pet(pet_id)
+        except Exception:
+            db.session.rollback()
+            logger.exception('Falha ao remover o pet %s (rode flask purge-deleted-pets)', pet_id)
+        finally:
+            with _running_lock:
+                _running.discard(pet_id)
+
+
+def start_purge(pet_id):
+    """Dispara a remoção do pet numa thread (ou na hora, se PURGE_IN_BACKGROUND=False)"""
+    if not current_app.config['PURGE_IN_BACKGROUND']:
+        purge_pet(pet_id)
+        return
+
+    with _running_lock:
+        if pet_id in _running:
+            return
+        _running.add(pet_id)
+
+    app = current_app._get_current_object()
+    threading.Thread(target=_run, args=(app, pet_id), name=f'purge-pet-{pet_id}', daemon=True).start()
+
+
+def pending_pet_ids():
+    """Pets deletados cuja remoção não terminou"""
+    return [t.pet_id for t in PetTombstone.query.filter(PetTombstone.purged_at.is_(None)).all()]
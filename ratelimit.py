@@ -0,0 +1,142 @@
+"""
+Limite de envios por dispositivo (token bucket) no /api/gps/update
+
+Cada api_key tem um balde com INGEST_RATE_BURST fichas que se recarrega a
+INGEST_RATE_PER_SECOND fichas por segundo. Cada fix gasta uma ficha; sem
+ficha, a resposta é 429 com Retry-After, antes de qualquer consulta ao
+banco. Assim um colar com defeito (ou intervalo mal configurado) não
+atrapalha a ingestão dos outros.
+
+Os baldes ficam em memória (um por processo). Com vários workers/servidores,
+configure RATE_LIMIT_STORAGE_URL=redis://... para compartilhá-los (requer o
+pacote `redis`). Qualquer objeto com `take()`, `add_device()` e `rejected()`
+serve de backend.
+
+Os fixes recusados só são contados para api_keys que já passaram pela
+validação (add_device, depois de achar o pet): chaves inventadas gastam
+fichas, mas não deixam contadores para trás.
+"""
+
+import math
+import threading
+import time
+
+from flask import current_app
+
+BUCKETS_SWEEP_SIZE = 10000
+
+
+class MemoryBackend:
+    """Baldes no próprio processo"""
+
+    def __init__(self):
+        self._buckets = {}
+        self._rejected = {}
+        self._devices = set()
+        self._lock = threading.Lock()
+
+    def _sweep(self, now, rate, burst):
+        # Baldes que já estariam cheios equivalem a não ter balde
+        for key, (tokens, last) in list(self._buckets.items()):
+            if tokens + (now - last) * rate >= burst:
+                del self._buckets[key]
+
+    def take(self, key, rate, burst):
+        """Gasta uma ficha. Retorna 0 se permitido, ou os segundos até haver ficha."""
+        now = time.monotonic()
+        with self._lock:
+            if len(self._buckets) > BUCKETS_SWEEP_SIZE:
+                self._sweep(now, rate, burst)
+
+            tokens, last = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0
+
+            self._buckets[key] = (tokens, now)
+            if key in self._devices:
+                self._rejected[key] = self._rejected.get(key, 0) + 1
+            return (1 - tokens) / rate
+
+    def add_device(self, key):
+        """Marca a api_key como válida (passa a contar os fixes recusados)"""
+        if key not in self._devices:
+            with self._lock:
+                self._devices.add(key)
+
+    def rejected(self, key):
+        return self._rejected.get(key, 0)
+
+
+class RedisBackend:
+    """Baldes compartilhados entre processos/servidores (script Lua atômico)"""
+
+    SCRIPT = '''
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'last')
+    local tokens = tonumber(bucket[1]) or burst
+    local last = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - last) * rate)
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+        if redis.call('EXISTS', KEYS[2]) == 1 then
+            redis.call('HINCRBY', KEYS[2], 'rejected', 1)
+        end
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'last', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return tostring(wait)
+    '''
+
+    def __init__(self, url, prefix='patatag:ingest:'):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self._take = self._redis.register_script(self.SCRIPT)
+        self._prefix = prefix
+        self._devices = set()  # já marcadas por este processo
+
+    def take(self, key, rate, burst):
+        keys = [f'{self._prefix}bucket:{key}', f'{self._prefix}stats:{key}']
+        return float(self._take(keys=keys, args=[rate, burst, time.time()]))
+
+    def add_device(self, key):
+        if key not in self._devices:
+            self._redis.hsetnx(f'{self._prefix}stats:{key}', 'rejected', 0)
+            self._devices.add(key)
+
+    def rejected(self, key):
+        return int(self._redis.hget(f'{self._prefix}stats:{key}', 'rejected') or 0)
+
+
+def init_app(app):
+    url = app.config['RATE_LIMIT_STORAGE_URL']
+    app.extensions['ingest_rate_limit'] = RedisBackend(url) if url else MemoryBackend()
+
+
+def _backend():
+    return current_app.extensions['ingest_rate_limit']
+
+
+def ingest_retry_after(api_key):
+    """0 se o dispositivo pode enviar agora, ou os segundos (inteiros) até poder"""
+    config = current_app.config
+    wait = _backend().take(api_key, config['INGEST_RATE_PER_SECOND'], config['INGEST_RATE_BURST'])
+    return math.ceil(wait) if wait > 0 else 0
+
+
+def device_validated(api_key):
+    """Chamar quando a api_key for de um pet (os recusados passam a ser contados)"""
+    _backend().add_device(api_key)
+
+
+def rejected_fixes(api_key):
+    """Quantos fixes deste dispositivo foram recusados pelo limite"""
+    return _backend().rejected(api_key)
@@ -0,0 +1,57 @@
+"""
+Intervalo de envio adaptativo do rastreador
+
+A resposta de /api/gps/update traz `next_interval_s`: em quantos segundos o
+ESP32 deve mandar o próximo fix. Parado e com bateria baixa ele envia pouco;
+correndo, perto da borda de uma cerca, fora da cerca ou com o dono olhando o
+mapa em tempo real, envia mais.
+"""
+
+from flask import current_app
+
+from geo import haversine_distance
+
+
+def nearest_geofence_edge(zones, latitude, longitude):
+    """
+    (distância em metros até a borda mais próxima, se está fora de alguma
+    cerca), ou (None, False) se o pet não tem cercas ativas
+    """
+    edge = None
+    outside = False
+    for zone in zones:
+        distance = haversine_distance(zone.center_lat, zone.center_lng, latitude, longitude)
+        outside = outside or distance > zone.radius_meters
+        to_edge = abs(zone.radius_meters - distance)
+        edge = to_edge if edge is None else min(edge, to_edge)
+    return edge, outside
+
+
+def next_report_interval(speed, stationary, battery_level, zones, latitude, longitude, watched):
+    """Segundos até o próximo envio (speed em km/h, como o ESP32 manda)"""
+    config = current_app.config
+    speed_ms = speed / 3.6 if speed else 0.0
+
+    if stationary:
+        interval = config['REPORT_INTERVAL_STATIONARY']
+    elif speed_ms > config['STATIONARY_MAX_SPEED'] / 3.6:
+        # Em movimento: no máximo REPORT_MAX_GAP_METERS entre dois fixes
+        interval = min(config['REPORT_INTERVAL_DEFAULT'], config['REPORT_MAX_GAP_METERS'] / speed_ms)
+    else:
+        interval = config['REPORT_INTERVAL_DEFAULT']
+
+    if battery_level is not None and battery_level <= config['REPORT_LOW_BATTERY']:
+        interval *= 2
+
+    # Os casos abaixo valem mesmo com bateria baixa
+    edge, outside = nearest_geofence_edge(zones, latitude, longitude)
+    if outside:
+        interval = min(interval, config['REPORT_INTERVAL_ALERT'])
+    elif edge is not None:
+        # Tempo para alcançar a borda correndo (velocidade atual ou a típica de um pet)
+        interval = min(interval, edge / max(speed_ms, config['REPORT_PET_SPEED']))
+
+    if watched:
+        interval = min(interval, config['REPORT_INTERVAL_LIVE'])
+
+    return int(min(max(interval, config['REPORT_INTERVAL_MIN']), config['REPORT_INTERVAL_MAX']))
@@ -0,0 +1,77 @@
+"""
+Roteamento de leituras para uma réplica do banco
+
+Se READ_DATABASE_URL estiver configurada, as rotas marcadas com
+@use_read_replica fazem suas consultas na réplica. Escritas (flush) sempre
+vão para o banco principal, e um cliente que acabou de escrever continua
+lendo do principal por REPLICA_LAG_TOLERANCE segundos (read-your-writes).
+
+A marca da última escrita fica no cookie de sessão, que todos os workers
+enxergam. Clientes com token (Authorization: Bearer) não têm sessão, então
+as leituras deles vão sempre para o principal.
+
+Para testar localmente, copie o arquivo SQLite do banco principal e aponte
+READ_DATABASE_URL para a cópia.
+"""
+
+import time
+from functools import wraps
+
+from flask import current_app, g, has_app_context, request, session
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND = 'replica'
+SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+
+class RoutingSession(Session):
+    """
+    Sessão que usa a réplica nas requisições marcadas como somente leitura
+    (escritas, pelo flush ou por UPDATE/DELETE direto, vão sempre para o principal)
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and not getattr(clause, 'is_dml', False)
+            and has_app_context()
+            and g.get('use_read_replica')
+            and REPLICA_BIND in self._db.engines
+        ):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def replica_configured():
+    return REPLICA_BIND in current_app.config.get('SQLALCHEMY_BINDS', {})
+
+
+def recently_wrote():
+    """O cliente escreveu algo há menos de REPLICA_LAG_TOLERANCE segundos?"""
+    last_write = session.get('_last_write')
+    return last_write is not None and time.time() - last_write < current_app.config['REPLICA_LAG_TOLERANCE']
+
+
+def use_read_replica(view):
+    """Decorador para rotas somente leitura que podem ser atendidas pela réplica"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if replica_configured() and 'Authorization' not in request.headers and not recently_wrote():
+            g.use_read_replica = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def init_app(app):
+    @app.after_request
+    def remember_last_write(response):
+        # Só para usuários com sessão: o ESP32 não precisa de cookie
+        if (
+            replica_configured()
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and session.get('_user_id') is not None
+        ):
+            session['_last_write'] = time.time()
+        return response
@@ -0,0 +1,142 @@
+"""
+Atualização do esquema de bancos já existentes
+
+`db.create_all()` cria tabelas novas, mas não adiciona colunas novas em
+tabelas que já existem. Este módulo compara os modelos com o banco e faz
+`ALTER TABLE ... ADD COLUMN` para o que estiver faltando, preenchendo os
+valores iniciais quando necessário. Tabelas cujo formato das colunas mudou
+(ex: `locations` compacta) são reconstruídas com os dados convertidos.
+"""
+
+from sqlalchemy import MetaData, Table, select, text
+from sqlalchemy.schema import CreateIndex
+
+from models import db, Location
+from geo import geohash_encode
+
+MIGRATION_CHUNK_SIZE = 5000
+
+# Colunas antigas de `locations` -> colunas do formato compacto
+COMPACT_LOCATION_COLUMNS = {
+    'latitude': 'latitude_e7',
+    'longitude': 'longitude_e7',
+    'altitude': 'altitude_m',
+    'speed': 'speed_e2',
+    'hdop': 'hdop_e2',
+    'timestamp': 'timestamp_us',
+    'dwell_until': 'dwell_until_us',
+}
+
+
+def backfill_pet_geohash(conn):
+    """Geohash da última posição de cada pet (calculado em Python)"""
+    rows = conn.exec_driver_sql(
+        'SELECT id, last_latitude, last_longitude FROM pets WHERE last_latitude IS NOT NULL'
+    ).fetchall()
+    if rows:
+        conn.execute(
+            text('UPDATE pets SET geohash = :geohash WHERE id = :id'),
+            [{'id': pet_id, 'geohash': geohash_encode(lat, lng)} for pet_id, lat, lng in rows]
+        )
+
+
+def rebuild_compact_locations(conn):
+    """
+    Passa `locations` para o formato compacto (inteiros escalados): renomeia a
+    tabela antiga, cria a nova e copia as linhas em lotes, convertendo os
+    valores pelos tipos do modelo. Os ids são mantidos.
+    """
+    for index in db.inspect(conn).get_indexes('locations'):
+        conn.exec_driver_sql(f'DROP INDEX {index["name"]}')
+    conn.exec_driver_sql('ALTER TABLE locations RENAME TO locations_old')
+    Location.__table__.create(conn)
+
+    # Tabela antiga refletida com os tipos originais (datas voltam como datetime)
+    old = Table('locations_old', MetaData(), autoload_with=conn)
+    new = Location.__table__
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(old).where(old.c.id > last_id).order_by(old.c.id).limit(MIGRATION_CHUNK_SIZE)
+        ).mappings().all()
+        if not rows:
+            break
+        conn.execute(new.insert(), [
+            {COMPACT_LOCATION_COLUMNS.get(name, name): value for name, value in row.items()}
+            for row in rows
+        ])
+        last_id = rows[-1]['id']
+
+    conn.exec_driver_sql('DROP TABLE locations_old')
+    if conn.dialect.name == 'postgresql':
+        # A sequência nova do id começa do 1: continua depois do maior id copiado
+        conn.exec_driver_sql(
+            "SELECT setval(pg_get_serial_sequence('locations', 'id'), COALESCE(MAX(id), 0) + 1, false) "
+            'FROM locations'
+        )
+
+
+# Tabelas reconstruídas quando falta a coluna que marca o formato novo:
+# tabela -> (coluna, função(conn))
+REBUILDS = {
+    'locations': ('timestamp_us', rebuild_compact_locations),
+}
+
+
+# Roda antes da reconstrução de `locations` (pets vem antes na ordem das tabelas),
+# ainda com as colunas antigas
+LATEST_LOCATION = (
+    'SELECT {column} FROM locations WHERE locations.pet_id = pets.id '
+    'ORDER BY locations.timestamp DESC LIMIT 1'
+)
+
+# Preenchimento de colunas recém-adicionadas: (tabela, coluna) -> SQL ou função(conn)
+BACKFILLS = {
+    ('pets', 'updated_at'): 'UPDATE pets SET updated_at = COALESCE(last_seen, created_at)',
+    ('pets', 'last_latitude'): f'UPDATE pets SET last_latitude = ({LATEST_LOCATION.format(column="latitude")})',
+    ('pets', 'last_longitude'): f'UPDATE pets SET last_longitude = ({LATEST_LOCATION.format(column="longitude")})',
+    ('pets', 'geohash'): backfill_pet_geohash,
+    # Tombstones antigos são de remoções imediatas: já terminaram
+    ('pet_tombstones', 'purged_at'): 'UPDATE pet_tombstones SET purged_at = deleted_at',
+}
+
+
+def upgrade_schema():
+    """Cria tabelas/colunas/índices que faltam. Retorna a lista do que foi alterado."""
+    db.create_all()
+
+    inspector = db.inspect(db.engine)
+    changes = []
+
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing = {col['name'] for col in inspector.get_columns(table.name)}
+
+            rebuild = REBUILDS.get(table.name)
+            if rebuild and rebuild[0] not in existing:
+                # A tabela é recriada com todas as colunas e índices do modelo
+                rebuild[1](conn)
+                changes.append(table.name)
+                continue
+
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+
+                col_type = column.type.compile(dialect=conn.dialect)
+                conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}')
+                changes.append(f'{table.name}.{column.name}')
+
+                backfill = BACKFILLS.get((table.name, column.name))
+                if callable(backfill):
+                    backfill(conn)
+                elif backfill:
+                    conn.exec_driver_sql(backfill)
+
+            existing_indexes = {idx['name'] for idx in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    conn.execute(CreateIndex(index))
+                    changes.append(index.name)
+
+    return changes
@@ -43,6 +43,10 @@ async function uploadImage(file) {
     return await apiRequest('/api/upload', 'POST', formData);
 }
 
+// Carga inicial do painel/mapa: usuário, pets (com última localização,
+// cercas e alertas não lidos) e alertas recentes numa requisição só
+async function getBootstrap() { return await apiRequest('/api/bootstrap'); }
+
 // Pets
 async function getPets() { return await apiRequest('/api/pets'); }
 async function getPet(id) { return await apiRequest(`/api/pets/${id}`); }
@@ -51,10 +55,16 @@ async function createPet(name, species, breed, photoUrl) {
 }
 async function updatePet(id, data) { return await apiRequest(`/api/pets/${id}`, 'PUT', data); }
 async function deletePet(id) { return await apiRequest(`/api/pets/${id}`, 'DELETE'); }
+// bbox = [min_lat, min_lng, max_lat, max_lng]; zoom do mapa (Leaflet)
+async function getPetClusters(bbox, zoom) {
+    return await apiRequest(`/api/pets/clusters?bbox=${bbox.join(',')}&zoom=${zoom}`);
+}
 
 // Localização
 async function getPetLocation(id) { return await apiRequest(`/api/pets/${id}/location`); }
-async function getPetHistory(id) { return await apiRequest(`/api/pets/${id}/history`); }
+async function getPetHistory(id, page = 1, limit = 100, format = 'objects') {
+    return await apiRequest(`/api/pets/${id}/history?page=${page}&limit=${limit}&format=${format}`);
+}
 
 // Cercas Virtuais
 async function getGeofences(id) { return await apiRequest(`/api/pets/${id}/geofence`); }
@@ -4,6 +4,8 @@ let petMarker = null;
 let historyLine = null;
 let geofenceCircles = [];
 let eventSource = null;
+let fleetLayer = null;
+let fleetRefresh = null;
 
 // ==========================================
 // 1. INICIALIZAÇÃO
@@ -122,16 +124,18 @@ window.updatePetMarker = function(lat, lng, petName = 'Pet', status = 'online',
 // 3. LÓGICA DE CARREGAMENTO (ATUALIZADO)
 // ==========================================
 
-window.loadPetOnMap = async function(petId) {
+// `pet` (opcional): dados já carregados (ex: de getBootstrap), com
+// last_location; evita buscar o pet e a localização de novo
+window.loadPetOnMap = async function(petId, pet = null) {
     if (!petId) return;
 
     try {
         // 1. Busca dados do Pet (incluindo a URL da foto)
-        const petData = await window.getPet(petId); 
+        const petData = pet || await window.getPet(petId); 
         
         // 2. Busca localização
         try {
-            const locData = await window.getPetLocation(petId);
+            const locData = (pet && pet.last_location) || await window.getPetLocation(petId);
             
             // 3. Atualiza marcador PASSANDO A FOTO
             window.updatePetMarker(
@@ -189,10 +193,156 @@ window.clearGeofences = function() {
     geofenceCircles = [];
 };
 
+// Aceita localizações ({latitude, longitude}) ou pontos [lat, lng] (ex: de decodePolyline)
 window.showLocationHistory = function(locations) {
     if (!map || !locations.length) return;
     if (historyLine) map.removeLayer(historyLine);
-    const points = locations.map(l => [l.latitude, l.longitude]);
+    const points = Array.isArray(locations[0]) ? locations : locations.map(l => [l.latitude, l.longitude]);
     historyLine = L.polyline(points, { color: '#F97316', weight: 4 }).addTo(map);
     map.fitBounds(historyLine.getBounds());
-};
\ No newline at end of file
+};
+
+// ==========================================
+// 5. FORMATOS COMPACTOS (format=polyline / format=columns)
+// ==========================================
+
+// Decodifica um "encoded polyline" em pontos [lat, lng].
+// `start` continua uma sequência (stream): use o último ponto retornado antes.
+window.decodePolyline = function(encoded, precision = 5, start = [0, 0]) {
+    const factor = Math.pow(10, precision);
+    const points = [];
+    let lat = Math.round(start[0] * factor);
+    let lng = Math.round(start[1] * factor);
+    let index = 0;
+
+    const nextValue = () => {
+        let result = 0, shift = 0, byte;
+        do {
+            byte = encoded.charCodeAt(index++) - 63;
+            result |= (byte & 0x1f) << shift;
+            shift += 5;
+        } while (byte >= 0x20);
+        return (result & 1) ? ~(result >> 1) : (result >> 1);
+    };
+
+    while (index < encoded.length) {
+        lat += nextValue();
+        lng += nextValue();
+        points.push([lat / factor, lng / factor]);
+    }
+    return points;
+};
+
+// Converte a resposta em colunas de volta para uma lista de localizações
+window.decodeColumns = function(columns) {
+    const names = Object.keys(columns);
+    const present = names.find(name => columns[name] !== null);
+    const count = present ? columns[present].length : 0;
+    const locations = [];
+    let timestamp = 0;
+
+    for (let i = 0; i < count; i++) {
+        const location = {};
+        names.forEach(name => {
+            const values = columns[name];
+            let value = values === null ? null : values[i];
+            if (name === 'timestamp') {
+                timestamp += value;  // diferenças em ms
+                value = new Date(timestamp);
+            } else if (name === 'dwell_until' && value !== null) {
+                value = new Date(value);
+            }
+            location[name] = value;
+        });
+        locations.push(location);
+    }
+    return locations;
+};
+
+// Decodificador do stream com format=polyline (cada evento traz a diferença para o anterior).
+// Eventos com reset: true (o primeiro de cada conexão, inclusive depois de
+// uma reconexão automática do EventSource) são absolutos.
+window.createStreamDecoder = function(precision = 5) {
+    let last = [0, 0];
+    return function(event) {
+        if (event.reset) last = [0, 0];
+        const points = window.decodePolyline(event.polyline, precision, last);
+        last = points[points.length - 1];
+        return { ...event, latitude: last[0], longitude: last[1] };
+    };
+};
+
+// ==========================================
+// 6. FROTA (CLUSTERS)
+// ==========================================
+
+// Todos os pets do usuário na área visível, agrupados pelo servidor
+// (GET /api/pets/clusters). Recarrega a cada movimento do mapa.
+// onSelectPet(petId) é chamado ao clicar num pet individual.
+window.showFleet = function(onSelectPet = null) {
+    if (!map) return;
+    window.hideFleet();
+    fleetLayer = L.layerGroup().addTo(map);
+    let request = 0;
+
+    fleetRefresh = async function() {
+        const current = ++request;
+        const bounds = map.getBounds();
+        const bbox = [bounds.getSouth(), bounds.getWest(), bounds.getNorth(), bounds.getEast()];
+        let data;
+        try {
+            data = await getPetClusters(bbox, map.getZoom());
+        } catch (e) {
+            console.error("Erro ao carregar pets:", e);
+            return;
+        }
+        if (current !== request || !fleetLayer) return; // resposta de um movimento anterior
+        fleetLayer.clearLayers();
+
+        data.clusters.forEach(cluster => {
+            if (cluster.count === 1) {
+                fleetLayer.addLayer(fleetPetMarker(cluster.pet_id, cluster.latitude, cluster.longitude,
+                    `Bateria: ${cluster.battery_min ?? '-'}%`, cluster.online > 0, onSelectPet));
+                return;
+            }
+            const icon = L.divIcon({
+                className: 'fleet-cluster',
+                html: `<div style="background:#F97316;color:#fff;border-radius:50%;width:40px;height:40px;display:flex;align-items:center;justify-content:center;font-weight:bold;border:3px solid white;box-shadow:0 2px 6px rgba(0,0,0,0.3);">${cluster.count}</div>`,
+                iconSize: [40, 40], iconAnchor: [20, 20]
+            });
+            const marker = L.marker([cluster.latitude, cluster.longitude], { icon });
+            marker.bindTooltip(`${cluster.online} online · ${cluster.low_battery} com bateria baixa`);
+            marker.on('click', () => {
+                const [south, west, north, east] = cluster.bbox;
+                map.fitBounds([[south, west], [north, east]], { padding: [40, 40] });
+            });
+            fleetLayer.addLayer(marker);
+        });
+
+        data.pets.forEach(pet => {
+            fleetLayer.addLayer(fleetPetMarker(pet.id, pet.latitude, pet.longitude,
+                `<b>${pet.name}</b><br>Bateria: ${pet.battery_level ?? '-'}%`, pet.is_online, onSelectPet));
+        });
+    };
+
+    map.on('moveend', fleetRefresh);
+    fleetRefresh();
+};
+
+window.hideFleet = function() {
+    if (!map) return;
+    if (fleetRefresh) map.off('moveend', fleetRefresh);
+    if (fleetLayer) map.removeLayer(fleetLayer);
+    fleetLayer = null;
+    fleetRefresh = null;
+};
+
+function fleetPetMarker(petId, lat, lng, popup, online, onSelectPet) {
+    const marker = L.circleMarker([lat, lng], {
+        radius: 8, color: 'white', weight: 2, fillOpacity: 1,
+        fillColor: online ? '#22C55E' : '#9CA3AF'
+    });
+    marker.bindPopup(popup);
+    if (onSelectPet) marker.on('click', () => onSelectPet(petId));
+    return marker;
+}
@@ -0,0 +1,148 @@
+"""
+Fixtures dos testes: apps com bancos SQLite semeados em tamanhos diferentes
+
+Cada tamanho tem o seu app, banco, arquivo frio e tabela de posições, todos
+numa pasta temporária. O app é semeado uma vez por sessão de testes.
+"""
+
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+import auth
+from app import create_app
+from config import Config
+from geo import geohash_encode
+from models import db, User, Pet, Location, GeofenceZone, Alert
+
+PASSWORD = '123456'
+
+# pets: pets do usuário | locations: localizações do pet principal
+# days: período coberto pelas localizações (o que passa de 90 dias é arquivado)
+# zones: cercas ativas do pet principal | alerts: alertas do usuário
+SIZES = {
+    'small': {'pets': 3, 'locations': 200, 'days': 2, 'zones': 2, 'alerts': 5},
+    'large': {'pets': 300, 'locations': 20000, 'days': 200, 'zones': 50, 'alerts': 500},
+}
+
+
+def make_config(folder):
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{folder}/patatag.db'
+        SQLALCHEMY_BINDS = {}
+        ARCHIVE_FOLDER = str(folder / 'archive')
+        UPLOAD_FOLDER = str(folder / 'uploads')
+        LATEST_POSITIONS_FILE = str(folder / 'latest_positions.bin')
+        PASSWORD_HASH_WORKERS = 0
+        PURGE_IN_BACKGROUND = False
+        # Contagem de consultas determinística: o usuário é carregado em toda requisição
+        USER_CACHE_TTL = 0
+        REGISTER_MAX_PER_IP = 10 ** 6
+        INGEST_RATE_BURST = 10 ** 6
+    return TestConfig
+
+
+def seed(app, size):
+    """Usuário, pets (todos com posição), histórico, cercas e alertas"""
+    spec = SIZES[size]
+    now = datetime.utcnow()
+
+    with app.app_context():
+        db.create_all()
+        user = User(name='Teste', email='teste@teste.com')
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.flush()
+
+        pets = [
+            Pet(name=f'Pet {i}', species='Cachorro', device_id=f'ESP32_{size}_{i}',
+                api_key=f'key-{size}-{i}', user_id=user.id, last_seen=now)
+            for i in range(spec['pets'])
+        ]
+        db.session.add_all(pets)
+        db.session.flush()
+        pet = pets[0]
+
+        # Histórico do pet principal e uma posição para cada um dos outros
+        step = timedelta(days=spec['days']) / spec['locations']
+        start = now - timedelta(days=spec['days'])
+        db.session.execute(db.insert(Location), [
+            {'pet_id': pet.id, 'latitude': -23.5505 + (i % 50) * 1e-4, 'longitude': -46.6333 + (i % 70) * 1e-4,
+             'speed': 3.5, 'satellites': 8, 'hdop': 1.2, 'timestamp': start + step * i}
+            for i in range(spec['locations'])
+        ])
+        db.session.execute(db.insert(Location), [
+            {'pet_id': other.id, 'latitude': -23.55 + i * 1e-4, 'longitude': -46.63, 'timestamp': now}
+            for i, other in enumerate(pets[1:])
+        ])
+        # Última posição (busca de próximos e agrupamento no mapa)
+        for i, other in enumerate(pets):
+            other.last_latitude = -23.55 + i * 1e-4
+            other.last_longitude = -46.63
+            other.geohash = geohash_encode(other.last_latitude, other.last_longitude)
+
+        db.session.add_all([
+            GeofenceZone(pet_id=pet.id, name=f'Cerca {i}', center_lat=-23.5505, center_lng=-46.6333,
+                         radius_meters=100 + i * 10)
+            for i in range(spec['zones'])
+        ])
+        db.session.add_all([
+            Alert(pet_id=pets[i % len(pets)].id, alert_type='geofence', message=f'Alerta {i}')
+            for i in range(spec['alerts'])
+        ])
+        db.session.commit()
+
+        import archive
+        archive.archive_cold_locations()
+
+        return {'user_id': user.id, 'pet_id': pet.id, 'api_key': pet.api_key}
+
+
+class Seeded:
+    """App semeado, com um cliente já logado e os ids criados"""
+
+    def __init__(self, app, size, ids):
+        self.app = app
+        self.size = size
+        self.ids = ids
+        self.client = app.test_client()
+        self.client.post('/api/login', json={'email': 'teste@teste.com', 'password': PASSWORD})
+
+    @contextmanager
+    def count_queries(self):
+        """Conta os comandos SQL enviados ao banco dentro do bloco"""
+        counter = {'queries': 0}
+
+        def before_cursor_execute(*args):
+            counter['queries'] += 1
+
+        with self.app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield counter
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    def measure(self, send):
+        """(consultas, milissegundos, resposta) de uma requisição"""
+        with self.count_queries() as counter:
+            started = time.perf_counter()
+            response = send(self.client)
+            elapsed = (time.perf_counter() - started) * 1000
+        return counter['queries'], elapsed, response
+
+
+@pytest.fixture(scope='session', params=sorted(SIZES))
+def seeded(request, tmp_path_factory):
+    size = request.param
+    app = create_app(make_config(tmp_path_factory.mktemp(size)))
+    ids = seed(app, size)
+    auth._user_cache.clear()
+    yield Seeded(app, size, ids)
+    with app.app_context():
+        db.engine.dispose()
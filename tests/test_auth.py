@@ -0,0 +1,18 @@
+"""
+Login e geração de token
+"""
+
+import pytest
+
+INVALID_CREDENTIALS = [
+    {'email': 5, 'password': '123456'},
+    {'email': ['teste@teste.com'], 'password': '123456'},
+    {'email': 'teste@teste.com', 'password': 123456},
+]
+
+
+@pytest.mark.parametrize('endpoint', ['/api/login', '/api/token'])
+@pytest.mark.parametrize('data', INVALID_CREDENTIALS)
+def test_credentials_must_be_strings(seeded, endpoint, data):
+    response = seeded.app.test_client().post(endpoint, json=data)
+    assert response.status_code == 400, response.get_data(as_text=True)[:300]
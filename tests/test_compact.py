@@ -0,0 +1,69 @@
+"""
+Formato polyline (compact.py) conferido com o decodificador de referência
+"""
+
+import pytest
+
+import compact
+
+
+def decode_polyline(encoded, precision=compact.POLYLINE_PRECISION, start=(0, 0)):
+    """Algoritmo de referência (Google): pontos em graus e o último em inteiros"""
+    points = []
+    index = 0
+    lat, lng = start
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            result = shift = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        points.append((lat / 10 ** precision, lng / 10 ** precision))
+    return points, (lat, lng)
+
+
+def flatten(points):
+    return [value for point in points for value in point]
+
+
+TRACK = [
+    (38.5, -120.2), (40.7, -120.95), (43.252, -126.453),
+    (-23.550520, -46.633308), (-23.550520, -46.633308), (0.0, 0.0),
+    (89.99999, 179.99999), (-89.99999, -179.99999),
+]
+
+
+def test_reference_example():
+    encoded, _ = compact.encode_polyline([38.5, 40.7, 43.252], [-120.2, -120.95, -126.453])
+    assert encoded == '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+
+
+@pytest.mark.parametrize('split', range(len(TRACK) + 1))
+def test_round_trip_with_continuation(split):
+    """Uma parte do trajeto e depois o resto a partir do último ponto (como no stream)"""
+    head, tail = TRACK[:split], TRACK[split:]
+    first, last_point = compact.encode_polyline([p[0] for p in head], [p[1] for p in head])
+    second, _ = compact.encode_polyline([p[0] for p in tail], [p[1] for p in tail], start=last_point)
+
+    decoded, decoder_point = decode_polyline(first)
+    assert decoder_point == last_point
+    decoded += decode_polyline(second, start=decoder_point)[0]
+    assert flatten(decoded) == pytest.approx(flatten(TRACK), abs=10 ** -compact.POLYLINE_PRECISION)
+
+
+def test_history_polyline_matches_objects(seeded):
+    url = f'/api/pets/{seeded.ids["pet_id"]}/history?limit=200'
+    objects = seeded.client.get(url).get_json()
+    compact_page = seeded.client.get(url + '&format=polyline').get_json()
+
+    expected = [(item['latitude'], item['longitude']) for item in objects['locations']]
+    decoded, _ = decode_polyline(compact_page['polyline'], compact_page['precision'])
+    assert flatten(decoded) == pytest.approx(flatten(expected), abs=10 ** -compact.POLYLINE_PRECISION)
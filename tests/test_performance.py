@@ -0,0 +1,233 @@
+"""
+Orçamento de consultas SQL e de tempo por rota
+
+Cada caso faz a mesma requisição algumas vezes no app semeado (pequeno e
+grande, ver conftest.py) e confere:
+
+- o máximo de consultas SQL de uma requisição. O orçamento é o mesmo para
+  todos os tamanhos: uma consulta por pet/localização/cerca (N+1) estoura no
+  banco grande;
+- o menor tempo entre as repetições, em milissegundos. Em máquinas mais
+  lentas, PERF_BUDGET_SCALE=2 (por exemplo) multiplica os orçamentos de tempo.
+
+Toda rota do app precisa ter pelo menos um caso (test_every_route_has_a_budget).
+
+Uso:
+    pip install pytest
+    python -m pytest
+"""
+
+import io
+import itertools
+import os
+from collections import namedtuple
+
+import pytest
+
+from models import db, Pet, GeofenceZone, Alert
+from tests.conftest import PASSWORD, SIZES
+
+REPEAT = 3
+BUDGET_SCALE = float(os.environ.get('PERF_BUDGET_SCALE') or 1)
+
+# Rotas sem banco nem lógica própria
+UNBUDGETED = {'static'}
+
+_unique = itertools.count()
+
+
+# ============================================
+# PREPARAÇÃO (fora da contagem)
+# ============================================
+
+def new_pet(seeded, deleted=False):
+    """Pet vazio do usuário de teste; retorna o id"""
+    with seeded.app.app_context():
+        pet = Pet(name='Temporário', user_id=seeded.ids['user_id'], api_key=f'tmp-{next(_unique)}')
+        db.session.add(pet)
+        db.session.commit()
+        pet_id = pet.id
+
+    if deleted:
+        seeded.client.delete(f'/api/pets/{pet_id}')
+    return pet_id
+
+
+def new_zone(seeded):
+    with seeded.app.app_context():
+        zone = GeofenceZone(pet_id=seeded.ids['pet_id'], name='Temporária',
+                            center_lat=-23.55, center_lng=-46.63, radius_meters=50)
+        db.session.add(zone)
+        db.session.commit()
+        return zone.id
+
+
+def new_alert(seeded):
+    with seeded.app.app_context():
+        alert = Alert(pet_id=seeded.ids['pet_id'], alert_type='battery', message='Bateria baixa')
+        db.session.add(alert)
+        db.session.commit()
+        return alert.id
+
+
+def logged_in_client(seeded):
+    client = seeded.app.test_client()
+    client.post('/api/login', json={'email': 'teste@teste.com', 'password': PASSWORD})
+    return client
+
+
+def deep_history_page(seeded):
+    """Penúltima página de 100 (passa pela tabela e chega ao arquivo frio)"""
+    return max(1, SIZES[seeded.size]['locations'] // 100 - 1)
+
+
+def revalidate(seeded, url):
+    """Pede a URL de novo com o ETag da resposta anterior (espera 304)"""
+    etag = seeded.client.get(url).headers['ETag']
+    return lambda c: c.get(url, headers={'If-None-Match': etag})
+
+
+def first_event(client, url):
+    """Abre o stream SSE e lê só o primeiro evento"""
+    response = client.get(url, buffered=False)
+    try:
+        chunk = next(iter(response.response))
+    finally:
+        response.close()
+    assert chunk.startswith(b'data: ')
+    return response
+
+
+# ============================================
+# CASOS
+# ============================================
+
+# endpoint, id do caso, consultas máximas, tempo máximo (ms), status esperado,
+# prepare(seeded) -> send(client)
+Case = namedtuple('Case', 'endpoint name queries ms status prepare')
+
+CASES = [
+    # Páginas
+    Case('pages.index', 'index', 1, 50, 302, lambda s: lambda c: c.get('/')),
+    Case('pages.dashboard', 'dashboard', 1, 50, 200, lambda s: lambda c: c.get('/dashboard')),
+    Case('pages.mapa', 'mapa', 1, 50, 200, lambda s: lambda c: c.get(f'/mapa/{s.ids["pet_id"]}')),
+    Case('pages.adicionar_pet', 'adicionar-pet', 1, 50, 200, lambda s: lambda c: c.get('/adicionar-pet')),
+    Case('pages.perfil', 'perfil', 1, 50, 200, lambda s: lambda c: c.get('/perfil')),
+    Case('auth.login', 'login', 1, 50, 200, lambda s: lambda c: c.get('/login')),
+    Case('auth.cadastro', 'cadastro', 1, 50, 200, lambda s: lambda c: c.get('/cadastro')),
+    Case('serve_asset', 'asset', 0, 50, (200, 404), lambda s: lambda c: c.get('/assets/api.js')),
+
+    # Autenticação (o hash de senha domina o tempo)
+    Case('auth.api_register', 'register', 3, 1000, 201, lambda s: lambda c: c.post('/api/register', json={
+        'name': 'Novo', 'email': f'novo{next(_unique)}@teste.com', 'password': PASSWORD
+    })),
+    Case('auth.api_login', 'login-api', 1, 1000, 200, lambda s: lambda c: c.post('/api/login', json={
+        'email': 'teste@teste.com', 'password': PASSWORD
+    })),
+    Case('auth.api_token', 'token', 1, 1000, 200, lambda s: lambda c: c.post('/api/token', json={
+        'email': 'teste@teste.com', 'password': PASSWORD
+    })),
+    Case('auth.api_logout', 'logout', 1, 50, 200,
+         lambda s: (lambda client: lambda c: client.post('/api/logout'))(logged_in_client(s))),
+    Case('auth.update_user', 'update-user', 2, 50, 200,
+         lambda s: lambda c: c.put('/api/user', json={'name': 'Teste'})),
+    Case('auth.upload_file', 'upload', 1, 50, 200, lambda s: lambda c: c.post('/api/upload', data={
+        'file': (io.BytesIO(b'\x89PNG\r\n\x1a\n' + bytes(256)), 'foto.png')
+    })),
+
+    # Pets
+    Case('pets.get_pets', 'pets', 3, 150, 200, lambda s: lambda c: c.get('/api/pets')),
+    Case('pets.get_pets', 'pets-fields', 2, 100, 200, lambda s: lambda c: c.get('/api/pets?fields=name,battery_level')),
+    Case('pets.get_pets', 'pets-since', 3, 100, 200,
+         lambda s: lambda c: c.get('/api/pets?since=2000-01-01T00:00:00Z')),
+    Case('pets.get_nearby_pets', 'nearby', 2, 100, 200,
+         lambda s: lambda c: c.get('/api/pets/nearby?lat=-23.55&lng=-46.63&radius=2000')),
+    Case('pets.get_pet_clusters', 'clusters', 2, 50, 200,
+         lambda s: lambda c: c.get('/api/pets/clusters?bbox=-24,-47,-23,-46&zoom=10')),
+    Case('pets.get_pet_clusters', 'clusters-pets', 2, 100, 200,
+         lambda s: lambda c: c.get('/api/pets/clusters?bbox=-23.56,-46.64,-23.52,-46.62&zoom=17')),
+    Case('pets.get_pet', 'pet', 2, 50, 200, lambda s: lambda c: c.get(f'/api/pets/{s.ids["pet_id"]}')),
+    Case('pets.create_pet', 'create-pet', 3, 50, 201, lambda s: lambda c: c.post('/api/pets', json={'name': 'Rex'})),
+    Case('pets.update_pet', 'update-pet', 4, 50, 200,
+         lambda s: lambda c: c.put(f'/api/pets/{s.ids["pet_id"]}', json={'breed': 'SRD'})),
+    Case('pets.delete_pet', 'delete-pet', 9, 100, 200,
+         lambda s: (lambda pet_id: lambda c: c.delete(f'/api/pets/{pet_id}'))(new_pet(s))),
+    Case('pets.get_pet_deletion', 'deletion', 2, 50, 200,
+         lambda s: (lambda pet_id: lambda c: c.get(f'/api/pets/{pet_id}/deletion'))(new_pet(s, deleted=True))),
+    Case('pets.get_pet_device', 'device', 2, 50, 200, lambda s: lambda c: c.get(f'/api/pets/{s.ids["pet_id"]}/device')),
+
+    # Localização
+    Case('pets.get_pet_location', 'location', 3, 50, 200,
+         lambda s: lambda c: c.get(f'/api/pets/{s.ids["pet_id"]}/location')),
+    Case('pets.get_pet_history', 'history', 4, 100, 200,
+         lambda s: lambda c: c.get(f'/api/pets/{s.ids["pet_id"]}/history')),
+    Case('pets.get_pet_history', 'history-deep', 4, 150, 200,
+         lambda s: lambda c: c.get(f'/api/pets/{s.ids["pet_id"]}/history?page={deep_history_page(s)}&limit=100')),
+    Case('pets.get_pet_history', 'history-deep-polyline', 4, 100, 200,
+         lambda s: lambda c: c.get(
+             f'/api/pets/{s.ids["pet_id"]}/history?page={deep_history_page(s)}&limit=100&format=polyline'
+         )),
+    Case('pets.get_pet_history', 'history-polyline-long', 4, 200, 200,
+         lambda s: lambda c: c.get(f'/api/pets/{s.ids["pet_id"]}/history?limit=20000&format=polyline')),
+    Case('pets.get_pet_history', 'history-columns', 4, 100, 200,
+         lambda s: lambda c: c.get(f'/api/pets/{s.ids["pet_id"]}/history?format=columns')),
+    Case('gps.update_gps', 'gps', 8, 100, 200, lambda s: lambda c: c.post('/api/gps/update', json={
+        'api_key': s.ids['api_key'], 'latitude': -23.5505 + next(_unique) * 1e-3, 'longitude': -46.6333,
+        'speed': 4.0, 'satellites': 8, 'hdop': 1.1, 'battery': 80
+    })),
+    Case('stream.stream_pet_location', 'stream', 3, 100, 200,
+         lambda s: lambda c: first_event(c, f'/api/pets/{s.ids["pet_id"]}/stream')),
+
+    # Cercas
+    Case('geofence.get_geofences', 'geofences', 3, 50, 200,
+         lambda s: lambda c: c.get(f'/api/pets/{s.ids["pet_id"]}/geofence')),
+    Case('geofence.create_geofence', 'create-geofence', 4, 50, 201,
+         lambda s: lambda c: c.post(f'/api/pets/{s.ids["pet_id"]}/geofence', json={
+             'name': 'Casa', 'center_lat': -23.55, 'center_lng': -46.63, 'radius_meters': 100
+         })),
+    Case('geofence.delete_geofence', 'delete-geofence', 4, 50, 200,
+         lambda s: (lambda zone_id: lambda c: c.delete(f'/api/geofence/{zone_id}'))(new_zone(s))),
+    Case('geofence.analyze_geofences', 'analysis', 4, 1000, 200,
+         lambda s: lambda c: c.get(f'/api/pets/{s.ids["pet_id"]}/geofence/analysis')),
+
+    # Carga inicial do painel/mapa
+    Case('dashboard.get_bootstrap', 'bootstrap', 6, 100, 200, lambda s: lambda c: c.get('/api/bootstrap')),
+    Case('dashboard.get_bootstrap', 'bootstrap-304', 6, 100, 304, lambda s: revalidate(s, '/api/bootstrap')),
+    Case('pets.get_pets', 'pets-304', 3, 150, 304, lambda s: revalidate(s, '/api/pets')),
+
+    # Alertas
+    Case('alerts.get_alerts', 'alerts', 2, 50, 200, lambda s: lambda c: c.get('/api/alerts')),
+    Case('alerts.mark_alert_read', 'alert-read', 3, 50, 200,
+         lambda s: (lambda alert_id: lambda c: c.post(f'/api/alerts/{alert_id}/read'))(new_alert(s))),
+]
+
+
+# ============================================
+# TESTES
+# ============================================
+
+def test_every_route_has_a_budget(seeded):
+    endpoints = {rule.endpoint for rule in seeded.app.url_map.iter_rules()}
+    missing = endpoints - UNBUDGETED - {case.endpoint for case in CASES}
+    assert not missing, f'Rotas sem orçamento de consultas/tempo: {sorted(missing)}'
+
+
+@pytest.mark.parametrize('case', CASES, ids=[case.name for case in CASES])
+def test_route_budget(seeded, case):
+    queries = []
+    timings = []
+    for _ in range(REPEAT):
+        send = case.prepare(seeded)
+        count, elapsed, response = seeded.measure(send)
+        expected = case.status if isinstance(case.status, tuple) else (case.status,)
+        assert response.status_code in expected, response.get_data(as_text=True)[:300]
+        queries.append(count)
+        timings.append(elapsed)
+
+    assert max(queries) <= case.queries, (
+        f'{case.name} ({seeded.size}): {queries} consultas, orçamento {case.queries}'
+    )
+    budget = case.ms * BUDGET_SCALE
+    assert min(timings) <= budget, (
+        f'{case.name} ({seeded.size}): {min(timings):.1f} ms, orçamento {budget:.0f} ms'
+    )
@@ -0,0 +1,58 @@
+"""
+Validação dos parâmetros de busca por área (nearby e clusters) e ?since=
+"""
+
+from datetime import timedelta
+
+import pytest
+
+from blueprints.pets import parse_version
+from models import db
+
+INVALID_QUERIES = [
+    '/api/pets/nearby?lat=nan&lng=1',
+    '/api/pets/nearby?lat=1&lng=inf',
+    '/api/pets/nearby?lat=91&lng=1',
+    '/api/pets/nearby?lat=1&lng=-181',
+    '/api/pets/nearby?lat=1&lng=1&radius=nan',
+    '/api/pets/nearby?bbox=-inf,-inf,inf,inf',
+    '/api/pets/nearby?bbox=nan,0,1,1',
+    '/api/pets/nearby?bbox=-91,0,1,1',
+    '/api/pets/nearby?bbox=1,2,3',
+    '/api/pets/clusters?bbox=-inf,-inf,inf,inf&zoom=3',
+    '/api/pets/clusters?bbox=-24,-47,-23,-46&zoom=-2000',
+    '/api/pets/clusters?bbox=-24,-47,-23,-46&zoom=99999',
+]
+
+
+@pytest.mark.parametrize('url', INVALID_QUERIES)
+def test_invalid_area_is_rejected(seeded, url):
+    response = seeded.client.get(url)
+    assert response.status_code == 400, response.get_data(as_text=True)[:300]
+
+
+def test_bbox_across_the_antimeridian(seeded):
+    response = seeded.client.get('/api/pets/nearby?bbox=-24,170,-23,190')
+    assert response.status_code == 200
+    assert response.get_json()['total'] == 0
+
+
+def test_since_includes_late_commits(seeded):
+    version = seeded.client.get('/api/pets').get_json()['version']
+
+    # Transação que fez o flush antes da versão devolvida, mas só terminou depois
+    with seeded.app.app_context():
+        db.session.execute(
+            db.text("UPDATE pets SET updated_at = :at WHERE id = :id"),
+            {'at': parse_version(version) - timedelta(seconds=1), 'id': seeded.ids['pet_id']}
+        )
+        db.session.commit()
+
+    response = seeded.client.get(f'/api/pets?since={version}')
+    assert response.status_code == 200
+    assert seeded.ids['pet_id'] in [pet['id'] for pet in response.get_json()['pets']]
+
+
+def test_since_out_of_range(seeded):
+    response = seeded.client.get('/api/pets?since=0001-01-01T00:00:00')
+    assert response.status_code == 400
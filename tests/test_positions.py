@@ -0,0 +1,58 @@
+"""
+Tabela de últimas posições (positions.py)
+"""
+
+import pytest
+
+from positions import LatestPositions, Record
+
+
+def make_record(pet_id, location_id, latitude=-23.5):
+    return Record(
+        pet_id=pet_id, user_id=1, created_at=1_000_000, location_id=location_id,
+        latitude=latitude, longitude=-46.6, altitude=0.0, speed=0.0, hdop=1.0,
+        timestamp=location_id * 1_000_000, dwell_until=-1, dwell_count=1,
+        satellites=8, battery=90
+    )
+
+
+@pytest.fixture
+def table(tmp_path):
+    return LatestPositions(str(tmp_path / 'latest_positions.bin'), slots=8)
+
+
+def test_write_and_read(table):
+    record = make_record(3, 10)
+    table.write(3, record)
+    assert table.read(3) == record
+    assert table.read(11) is None  # mesmo slot, outro pet
+
+
+def test_only_if_newer_keeps_the_newer_fix(table):
+    table.write(3, make_record(3, 10, latitude=1.0))
+    table.write(3, make_record(3, 9, latitude=2.0), only_if_newer=True)
+    assert table.read(3).latitude == 1.0
+
+    table.write(3, make_record(3, 11, latitude=3.0), only_if_newer=True)
+    assert table.read(3).latitude == 3.0
+
+
+def test_only_if_newer_replaces_another_pet(table):
+    table.write(3, make_record(3, 10))
+    table.write(11, make_record(11, 5), only_if_newer=True)
+    assert table.read(11).location_id == 5
+    assert table.read(3) is None
+
+
+def test_write_without_only_if_newer_always_replaces(table):
+    table.write(3, make_record(3, 10))
+    table.write(3, make_record(3, 9))
+    assert table.read(3).location_id == 9
+
+
+def test_clear(table):
+    table.write(3, make_record(3, 10))
+    table.clear()
+    assert table.read(3) is None
+    table.write(3, make_record(3, 9), only_if_newer=True)
+    assert table.read(3).location_id == 9
@@ -0,0 +1,72 @@
+"""
+Leituras na réplica e read-your-writes (routing.py)
+
+A "réplica" é uma cópia do arquivo SQLite do principal feita antes das
+escritas: o que for lido dela não enxerga o que acabou de ser gravado.
+"""
+
+import shutil
+
+import pytest
+
+import auth
+from app import create_app
+from models import db
+from tests.conftest import PASSWORD, make_config, seed
+
+
+@pytest.fixture
+def replicated(tmp_path):
+    primary = tmp_path / 'patatag.db'
+    replica = tmp_path / 'replica.db'
+
+    class ReplicaConfig(make_config(tmp_path)):
+        SQLALCHEMY_BINDS = {'replica': f'sqlite:///{replica}'}
+
+    app = create_app(ReplicaConfig)
+    seed(app, 'small')
+    with app.app_context():
+        db.engines[None].dispose()
+    shutil.copyfile(primary, replica)
+    auth._user_cache.clear()
+    yield app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def pet_names(response):
+    assert response.status_code == 200, response.get_data(as_text=True)[:300]
+    return {pet['name'] for pet in response.get_json()['pets']}
+
+
+def test_reads_go_to_the_replica(replicated):
+    client = replicated.test_client()
+    client.post('/api/login', json={'email': 'teste@teste.com', 'password': PASSWORD})
+    # O próprio login conta como escrita (read-your-writes): esquece a marca
+    with client.session_transaction() as session:
+        session.pop('_last_write', None)
+
+    # Escrita direto no principal, sem passar pelo cliente: a réplica não vê
+    with replicated.app_context():
+        db.session.execute(db.text("UPDATE pets SET name = 'Renomeado' WHERE id = 1"))
+        db.session.commit()
+
+    assert 'Renomeado' not in pet_names(client.get('/api/pets'))
+
+
+def test_session_client_reads_its_writes(replicated):
+    client = replicated.test_client()
+    client.post('/api/login', json={'email': 'teste@teste.com', 'password': PASSWORD})
+
+    assert client.post('/api/pets', json={'name': 'Novo'}).status_code == 201
+    assert 'Novo' in pet_names(client.get('/api/pets'))
+
+
+def test_bearer_client_reads_its_writes(replicated):
+    client = replicated.test_client()
+    token = client.post('/api/token', json={'email': 'teste@teste.com', 'password': PASSWORD}).get_json()['token']
+    headers = {'Authorization': f'Bearer {token}'}
+
+    assert client.post('/api/pets', json={'name': 'Novo'}, headers=headers).status_code == 201
+    assert 'Novo' in pet_names(client.get('/api/pets', headers=headers))
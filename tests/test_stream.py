@@ -0,0 +1,26 @@
+"""
+Stream SSE da localização (blueprints/stream.py)
+"""
+
+import json
+
+
+def read_first_event(client, url):
+    response = client.get(url, buffered=False)
+    try:
+        chunk = next(iter(response.response))
+    finally:
+        response.close()
+    assert chunk.startswith(b'data: ')
+    return json.loads(chunk[len(b'data: '):])
+
+
+def test_every_connection_starts_with_a_reset(seeded):
+    """O EventSource reconecta sozinho: cada conexão recomeça o polyline do zero"""
+    url = f'/api/pets/{seeded.ids["pet_id"]}/stream?format=polyline'
+    events = [read_first_event(seeded.client, url) for _ in range(2)]
+
+    for event in events:
+        assert event['reset'] is True
+        assert event['polyline']
+    assert events[0]['polyline'] == events[1]['polyline']